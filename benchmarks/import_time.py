@@ -0,0 +1,79 @@
+"""
+Cold start benchmark: the time to import the package and the time of the first conversion, both in a
+fresh interpreter, against their budgets. Exits with 1 when any of them is over budget.
+
+    python benchmarks/import_time.py [diagram.vsdx mapping.yaml]
+"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORTED_MODULE = 'mytml.processor'
+DEFAULT_DIAGRAM = os.path.join(ROOT, 'mytml', 'data', 'aws-with-tz-and-vpc.vsdx')
+DEFAULT_MAPPING = os.path.join(ROOT, 'mytml', 'data', 'iriusrisk-visio-aws-mapping.yaml')
+RUNS = 5
+
+# milliseconds
+IMPORT_BUDGET = 150
+FIRST_CONVERSION_BUDGET = 1500
+
+FIRST_CONVERSION_SCRIPT = '''
+import contextlib, sys, time
+start = time.perf_counter()
+from mytml.processor import Processor
+with contextlib.redirect_stdout(sys.stderr), open(sys.argv[1]) as source, open(sys.argv[2]) as mapping:
+    Processor('benchmark', source, [mapping.read()]).process()
+print((time.perf_counter() - start) * 1000)
+'''
+
+
+def run_python(args: [str]) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable] + args, cwd=ROOT, capture_output=True, text=True, check=True)
+
+
+def measure_import() -> tuple:
+    """
+    Cumulative import time of the module, in milliseconds, and the slowest modules it imports
+    """
+    result = run_python(['-X', 'importtime', '-c', f'import {IMPORTED_MODULE}'])
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules.append((int(cumulative) / 1000, name.strip()))
+
+    total = next(ms for ms, name in modules if name == IMPORTED_MODULE)
+    return total, sorted(modules, reverse=True)[1:6]
+
+
+def measure_first_conversion(diagram: str, mapping: str) -> float:
+    result = run_python(['-c', FIRST_CONVERSION_SCRIPT, diagram, mapping])
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def report(name: str, timings: [float], budget: float) -> bool:
+    best = min(timings)
+    within = best <= budget
+    print(f'{name:18} {best:8.1f} ms  (budget {budget} ms)  {"ok" if within else "OVER BUDGET"}')
+    return within
+
+
+def main(argv: [str]) -> int:
+    diagram, mapping = argv if len(argv) == 2 else (DEFAULT_DIAGRAM, DEFAULT_MAPPING)
+
+    # the best of several runs, the first ones also pay for filling the OS caches
+    imports = [measure_import() for _ in range(RUNS)]
+    conversions = [measure_first_conversion(diagram, mapping) for _ in range(RUNS)]
+
+    within = report(f'import {IMPORTED_MODULE}', [total for total, _ in imports], IMPORT_BUDGET)
+    for ms, name in min(imports)[1]:
+        print(f'    {ms:8.1f} ms  {name}')
+    within = report('first conversion', conversions, FIRST_CONVERSION_BUDGET) and within
+
+    return 0 if within else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
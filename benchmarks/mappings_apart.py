@@ -0,0 +1,63 @@
+"""
+Mappings prepared apart benchmark: converts a synthetic diagram with the mappings loaded before the diagram,
+the default, and with them prepared in another process while the diagram loads (prepare_mappings_apart),
+and reports the median time of both. Preparing them apart starts a process for every conversion and does
+not skip the geometry of the shapes no mapping can match, so it is only worth enabling where this shows a
+gain. It needs two CPUs at least.
+
+    python benchmarks/mappings_apart.py [copies] [mapping.yaml ...]
+"""
+import contextlib
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.peak_memory import SAMPLE_MAPPING, build_synthetic_diagram  # noqa: E402
+from mytml.processor import Processor, available_cpus  # noqa: E402
+
+DEFAULT_COPIES = 20
+RUNS = 5
+
+
+def convert(diagram_path: str, mappings: [str], prepare_mappings_apart: bool) -> float:
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(sys.stderr), open(diagram_path, 'r') as source:
+        Processor('benchmark', source, mappings, prepare_mappings_apart=prepare_mappings_apart).process()
+    return time.perf_counter() - start
+
+
+def main(argv: [str]) -> int:
+    if available_cpus() < 2:
+        print('the mappings are only prepared apart with two CPUs at least', file=sys.stderr)
+        return 1
+
+    copies = int(argv[0]) if argv else DEFAULT_COPIES
+    mappings = []
+    for path in argv[1:] or [SAMPLE_MAPPING]:
+        with open(path, 'r') as f:
+            mappings.append(f.read())
+
+    with tempfile.TemporaryDirectory() as directory:
+        diagram_path = os.path.join(directory, f'synthetic-{copies}.vsdx')
+        build_synthetic_diagram(copies, diagram_path)
+
+        # the libraries a conversion loads on first use are not part of its time
+        convert(diagram_path, mappings, False)
+        timings = {}
+        for prepare_mappings_apart in (False, True):
+            timings[prepare_mappings_apart] = statistics.median(
+                convert(diagram_path, mappings, prepare_mappings_apart) for _ in range(RUNS))
+
+    print(f'mappings loaded first     {timings[False] * 1000:8.1f} ms')
+    print(f'mappings prepared apart   {timings[True] * 1000:8.1f} ms  '
+          f'{"faster" if timings[True] < timings[False] else "slower"}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
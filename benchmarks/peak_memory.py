@@ -0,0 +1,111 @@
+"""
+Peak memory benchmark: converts a large synthetic diagram, made of copies of a sample diagram laid out in
+a grid, and checks the peak Python memory of the conversion (tracemalloc) against its budget. Exits with
+1 when it is over budget. tests/test_peak_memory.py asserts the same budget for the default copies.
+
+    python benchmarks/peak_memory.py [copies]
+"""
+import contextlib
+import copy
+import os
+import sys
+import tempfile
+import xml.etree.ElementTree as ET
+import zipfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from mytml.processor import Processor, load_mappings  # noqa: E402
+
+SAMPLE_DIAGRAM = os.path.join(ROOT, 'mytml', 'data', 'aws-with-tz-and-vpc.vsdx')
+SAMPLE_MAPPING = os.path.join(ROOT, 'mytml', 'data', 'iriusrisk-visio-aws-mapping.yaml')
+PAGE_PATH = 'visio/pages/page1.xml'
+VISIO_NAMESPACE = 'http://schemas.microsoft.com/office/visio/2012/main'
+
+DEFAULT_COPIES = 20
+COPIES_PER_ROW = 20
+COPY_OFFSET = 12.0
+COPY_ID_OFFSET = 1000
+
+# megabytes, for the default copies
+PEAK_MEMORY_BUDGET = 16
+
+
+def _tag(name: str) -> str:
+    return f'{{{VISIO_NAMESPACE}}}{name}'
+
+
+def _move_shape(shape, id_offset: int, dx: float, dy: float):
+    for element in shape.iter(_tag('Shape')):
+        element.set('ID', str(int(element.get('ID')) + id_offset))
+    for cell in shape.findall(_tag('Cell')):
+        if cell.get('N') in ('PinX', 'BeginX', 'EndX'):
+            cell.set('V', str(float(cell.get('V')) + dx))
+        if cell.get('N') in ('PinY', 'BeginY', 'EndY'):
+            cell.set('V', str(float(cell.get('V')) + dy))
+
+
+def build_synthetic_diagram(copies: int, output_path: str):
+    ET.register_namespace('', VISIO_NAMESPACE)
+    ET.register_namespace('r', 'http://schemas.openxmlformats.org/officeDocument/2006/relationships')
+
+    with zipfile.ZipFile(SAMPLE_DIAGRAM) as sample:
+        page = ET.fromstring(sample.read(PAGE_PATH))
+        shapes, connects = page.find(_tag('Shapes')), page.find(_tag('Connects'))
+        sample_shapes, sample_connects = list(shapes), list(connects)
+        for element in sample_shapes:
+            shapes.remove(element)
+        for element in sample_connects:
+            connects.remove(element)
+
+        for i in range(copies):
+            id_offset = i * COPY_ID_OFFSET
+            dx, dy = (i % COPIES_PER_ROW) * COPY_OFFSET, (i // COPIES_PER_ROW) * COPY_OFFSET
+            for element in sample_shapes:
+                shape = copy.deepcopy(element)
+                _move_shape(shape, id_offset, dx, dy)
+                shapes.append(shape)
+            for element in sample_connects:
+                connect = copy.deepcopy(element)
+                for attribute in ('FromSheet', 'ToSheet'):
+                    connect.set(attribute, str(int(connect.get(attribute)) + id_offset))
+                connects.append(connect)
+
+        with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as output:
+            for item in sample.infolist():
+                data = ET.tostring(page, xml_declaration=True, encoding='utf-8') if item.filename == PAGE_PATH \
+                    else sample.read(item.filename)
+                output.writestr(item, data)
+
+
+def convert(diagram_path: str, mapping_loader, trace_memory: bool) -> Processor:
+    with contextlib.redirect_stdout(sys.stderr), open(diagram_path, 'r') as source:
+        processor = Processor('benchmark', source, [], mapping_loader=mapping_loader, trace_memory=trace_memory)
+        processor.process()
+    return processor
+
+
+def main(argv: [str]) -> int:
+    copies = int(argv[0]) if argv else DEFAULT_COPIES
+    budget = PEAK_MEMORY_BUDGET * copies / DEFAULT_COPIES
+
+    with open(SAMPLE_MAPPING, 'r') as f:
+        mapping_loader = load_mappings([f.read()])
+
+    with tempfile.TemporaryDirectory() as directory:
+        diagram_path = os.path.join(directory, f'synthetic-{copies}.vsdx')
+        build_synthetic_diagram(copies, diagram_path)
+
+        # the libraries a conversion loads on first use are not part of its memory
+        convert(SAMPLE_DIAGRAM, mapping_loader, False)
+        peak = convert(diagram_path, mapping_loader, True).peak_memory / (1024 * 1024)
+
+    within = peak <= budget
+    print(f'peak memory {copies} copies  {peak:8.1f} MB  (budget {budget:.1f} MB)  '
+          f'{"ok" if within else "OVER BUDGET"}')
+    return 0 if within else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
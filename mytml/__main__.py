@@ -0,0 +1,4 @@
+import sys
+from mytml.cli import main
+
+sys.exit(main())
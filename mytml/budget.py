@@ -0,0 +1,99 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class CancellationToken:
+    """
+    Lets another thread abort a running conversion, which stops at its next budget check
+    """
+
+    def __init__(self):
+        self.__cancelled = threading.Event()
+
+    def cancel(self):
+        self.__cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.__cancelled.is_set()
+
+
+class BudgetExceededError(Exception):
+    """
+    Raised when a conversion goes over one of the limits of its budget, or is cancelled. reason is the
+    limit that was exceeded (time_limit, max_shapes, max_connectors, max_containment_tests or cancelled),
+    stage the stage the conversion was in and timings the seconds spent in every stage until then.
+    """
+
+    def __init__(self, reason: str, message: str, stage: str, timings: dict):
+        self.reason = reason
+        self.stage = stage
+        self.timings = timings
+        stage_timings = ', '.join(f'{name} {seconds:.3f}s' for name, seconds in timings.items())
+        super().__init__(f'Conversion budget exceeded in {stage}: {message} ({stage_timings})')
+
+
+class ConversionBudget:
+    """
+    Limits of a conversion, checked by the parsing and parent inference loops: the seconds it may take
+    since it starts, the shapes and connectors the diagram may have and the containment tests the parent
+    inference may make. None means no limit.
+    """
+
+    def __init__(self, time_limit: float = None, max_shapes: int = None, max_connectors: int = None,
+                 max_containment_tests: int = None, cancellation_token: CancellationToken = None):
+        self.time_limit = time_limit
+        self.max_shapes = max_shapes
+        self.max_connectors = max_connectors
+        self.max_containment_tests = max_containment_tests
+        self.cancellation_token = cancellation_token
+
+        self.deadline = None
+        self.containment_tests = 0
+        self.timings = {}
+        self.__stage = None
+        self.__stage_start = None
+
+    def start(self):
+        self.deadline = time.monotonic() + self.time_limit if self.time_limit is not None else None
+        self.containment_tests = 0
+        self.timings = {}
+        return self
+
+    @contextmanager
+    def stage(self, name: str):
+        self.__stage, self.__stage_start = name, time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - self.__stage_start
+            self.__stage, self.__stage_start = None, None
+
+    def check(self):
+        if self.cancellation_token is not None and self.cancellation_token.cancelled:
+            self.__exceeded('cancelled', 'the conversion was cancelled')
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            self.__exceeded('time_limit', f'it took longer than {self.time_limit}s')
+
+    def check_shapes(self, shapes: int):
+        if self.max_shapes is not None and shapes > self.max_shapes:
+            self.__exceeded('max_shapes', f'{shapes} shapes, more than {self.max_shapes}')
+
+    def check_connectors(self, connectors: int):
+        if self.max_connectors is not None and connectors > self.max_connectors:
+            self.__exceeded('max_connectors', f'{connectors} connectors, more than {self.max_connectors}')
+
+    def count_containment_tests(self, tests: int):
+        self.containment_tests += tests
+        if self.max_containment_tests is not None and self.containment_tests > self.max_containment_tests:
+            self.__exceeded('max_containment_tests',
+                            f'more than {self.max_containment_tests} containment tests')
+        self.check()
+
+    def __exceeded(self, reason: str, message: str):
+        timings = dict(self.timings)
+        if self.__stage is not None:
+            timings[self.__stage] = timings.get(self.__stage, 0.0) + time.perf_counter() - self.__stage_start
+        raise BudgetExceededError(reason, message, self.__stage, timings)
+
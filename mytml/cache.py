@@ -0,0 +1,106 @@
+import hashlib
+import os
+import tempfile
+from mytml import __version__
+
+DEFAULT_CACHE_MAX_SIZE = 256 * 1024 * 1024
+CACHE_ENTRY_SUFFIX = '.otm.json'
+
+
+def _to_bytes(data) -> bytes:
+    return data.encode() if isinstance(data, str) else data
+
+
+def calculate_cache_key(source_data: bytes, mapping_files: list, project_id: str, topology_only: bool = False,
+                        mapping_fingerprint: str = None) -> str:
+    key = hashlib.sha256()
+    parts = [__version__.encode(), _to_bytes(project_id or ''), hashlib.sha256(source_data).digest()]
+    # topology only OTMs are a different output of the same inputs
+    if topology_only:
+        parts.append(b'topology-only')
+    # the mappings of a loaded mapping loader, which may not be the mapping files given
+    if mapping_fingerprint is not None:
+        parts.append(b'mapping-loader:' + mapping_fingerprint.encode())
+    for part in parts:
+        key.update(len(part).to_bytes(8, 'big'))
+        key.update(part)
+    for mapping_file in mapping_files or []:
+        key.update(hashlib.sha256(_to_bytes(mapping_file or b'')).digest())
+    return key.hexdigest()
+
+
+class OTMCache:
+    """
+    Directory of serialized OTMs keyed by content hash, evicted least recently used first once it grows over
+    max_size bytes. Entries are written to a temporary file and renamed into place, so concurrent processes
+    sharing the directory only ever see complete entries.
+    """
+
+    def __init__(self, directory: str, max_size: int = DEFAULT_CACHE_MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def get(self, key: str):
+        path = self.__entry_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = f.read()
+            # the modification time is the recency used by the eviction
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return data
+
+    def put(self, key: str, data: str):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.__entry_path(key))
+        except BaseException:
+            self.__remove(tmp_path)
+            raise
+
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(CACHE_ENTRY_SUFFIX):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            self.__remove(path)
+            total_size -= size
+
+    def clear(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(CACHE_ENTRY_SUFFIX):
+                self.__remove(entry.path)
+
+    def __entry_path(self, key: str) -> str:
+        return os.path.join(self.directory, key + CACHE_ENTRY_SUFFIX)
+
+    @staticmethod
+    def __remove(path: str):
+        # another process may have evicted it first
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
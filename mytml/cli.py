@@ -0,0 +1,278 @@
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from mytml.worker import init_worker, convert_diagram, read_file, read_mapping
+from mytml.parsed_diagram import PARSED_DIAGRAM_EXTENSION
+
+DIAGRAM_EXTENSION = '.vsdx'
+OUTPUT_EXTENSION = '.otm.json'
+MEGABYTE = 1024 * 1024
+LIMITS = ['time_limit', 'max_shapes', 'max_connectors', 'max_containment_tests']
+
+
+def collect_diagrams(sources: [str], extensions: tuple = (DIAGRAM_EXTENSION,)) -> [tuple]:
+    """
+    Expands the given files and directory trees into (diagram path, path relative to its source) pairs
+    """
+    diagrams = []
+    for source in sources:
+        if not os.path.isdir(source):
+            diagrams.append((source, os.path.basename(source)))
+            continue
+
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for filename in sorted(files):
+                if filename.lower().endswith(extensions):
+                    path = os.path.join(root, filename)
+                    diagrams.append((path, os.path.relpath(path, source)))
+    return diagrams
+
+
+def write_output(output_dir: str, relative_path: str, otm: str):
+    output_path = os.path.join(output_dir, os.path.splitext(relative_path)[0] + OUTPUT_EXTENSION)
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(otm)
+
+
+def print_summary(results: [tuple], elapsed: float):
+    for path, seconds, otm, error, peak_memory in results:
+        memory = f'  {peak_memory / MEGABYTE:8.1f} MB' if peak_memory is not None else ''
+        print(f'{seconds:8.3f}s{memory}  {"ok   " if error is None else "error"}  {path}', file=sys.stderr)
+        if error is not None:
+            print(f'           {error}', file=sys.stderr)
+
+    failed = len([r for r in results if r[3] is not None])
+    print(f'{len(results)} diagrams, {failed} failed, {elapsed:.3f}s', file=sys.stderr)
+
+
+def load_mapping_files(mapping_paths: [str], override_paths: [str] = None):
+    from mytml.processor import load_mappings
+
+    with contextlib.redirect_stdout(sys.stderr):
+        mapping_loader = load_mappings([read_mapping(path) for path in mapping_paths])
+        if override_paths:
+            mapping_loader = load_mappings([read_file(path) for path in override_paths], mapping_loader)
+    return mapping_loader
+
+
+def get_limits(args) -> dict:
+    return {name: getattr(args, name) for name in LIMITS if getattr(args, name) is not None}
+
+
+def add_limit_arguments(command):
+    command.add_argument('--time-limit', type=float, help='seconds a conversion may take')
+    command.add_argument('--max-shapes', type=int, help='shapes a diagram may have')
+    command.add_argument('--max-connectors', type=int, help='connectors a diagram may have')
+    command.add_argument('--max-containment-tests', type=int,
+                         help='containment tests the parent inference of a diagram may make')
+
+
+def convert(args) -> int:
+    diagrams = collect_diagrams(args.sources, (DIAGRAM_EXTENSION, PARSED_DIAGRAM_EXTENSION))
+    relative_paths = dict(diagrams)
+    results = []
+    start = time.perf_counter()
+
+    worker_arguments = (args.mappings, args.cache_dir, args.memory, get_limits(args), args.validate_otm,
+                        args.topology_only, args.overrides, args.parent_workers)
+    try:
+        if args.jobs > 1:
+            # invalid mappings fail here, instead of in the initializer of every worker
+            load_mapping_files(args.mappings, args.overrides)
+        else:
+            init_worker(*worker_arguments)
+    except Exception as e:
+        print(f'{e.__class__.__name__} {e}', file=sys.stderr)
+        return 1
+
+    if args.jobs > 1:
+        executor = ProcessPoolExecutor(max_workers=args.jobs, initializer=init_worker, initargs=worker_arguments)
+        converted = executor.map(convert_diagram, [path for path, _ in diagrams],
+                                 [args.project_id] * len(diagrams))
+    else:
+        executor = None
+        converted = (convert_diagram(path, args.project_id) for path, _ in diagrams)
+
+    try:
+        for result in converted:
+            path, seconds, otm, error, _ = result
+            results.append(result)
+            if args.output_dir:
+                if otm is not None:
+                    write_output(args.output_dir, relative_paths[path], otm)
+            elif otm is not None:
+                sys.stdout.write(f'{{"source":{json.dumps(path)},"otm":{otm}}}\n')
+            else:
+                sys.stdout.write(json.dumps({"source": path, "error": error}) + '\n')
+            sys.stdout.flush()
+    finally:
+        if executor:
+            executor.shutdown()
+
+    print_summary(results, time.perf_counter() - start)
+    return 0 if all(r[3] is None for r in results) else 1
+
+
+def serve(args) -> int:
+    from mytml.service import ConversionService
+
+    service = ConversionService(args.mappings, args.host, args.port, args.workers, args.max_queue, args.cache_dir,
+                                get_limits(args))
+    print(f'Serving on {service.url}', file=sys.stderr)
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+    return 0
+
+
+def parse(args) -> int:
+    from mytml.processor import Processor
+    from mytml.parsed_diagram import serialize_diagram
+
+    failed = 0
+    start = time.perf_counter()
+    for path, relative_path in collect_diagrams(args.sources):
+        diagram_start = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(sys.stderr), open(path, 'r') as source:
+                diagram = Processor(None, source, [], parent_workers=args.parent_workers).parse_diagram()
+                data = serialize_diagram(diagram)
+        except Exception as e:
+            failed += 1
+            print(f'{time.perf_counter() - diagram_start:8.3f}s  error  {path}\n           '
+                  f'{e.__class__.__name__} {e}', file=sys.stderr)
+            continue
+
+        output_path = os.path.join(args.output_dir, os.path.splitext(relative_path)[0] + PARSED_DIAGRAM_EXTENSION)
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        with open(output_path, 'wb') as f:
+            f.write(data)
+        print(f'{time.perf_counter() - diagram_start:8.3f}s  ok     {path}', file=sys.stderr)
+
+    print(f'{failed} failed, {time.perf_counter() - start:.3f}s', file=sys.stderr)
+    return 0 if failed == 0 else 1
+
+
+def inspect(args) -> int:
+    from mytml.processor import Processor
+
+    mapping_loader = None
+    if args.mappings:
+        try:
+            mapping_loader = load_mapping_files(args.mappings, args.overrides)
+        except Exception as e:
+            print(f'{e.__class__.__name__} {e}', file=sys.stderr)
+            return 1
+
+    failed = 0
+    for path, _ in collect_diagrams(args.sources):
+        try:
+            with contextlib.redirect_stdout(sys.stderr), open(path, 'r') as source:
+                inspection = Processor(None, source, [], mapping_loader=mapping_loader).inspect()
+            sys.stdout.write(json.dumps({"source": path, "inspection": inspection.json()}) + '\n')
+        except Exception as e:
+            failed += 1
+            sys.stdout.write(json.dumps({"source": path, "error": f'{e.__class__.__name__} {e}'}) + '\n')
+        sys.stdout.flush()
+
+    return 0 if failed == 0 else 1
+
+
+def compile_mappings(args) -> int:
+    from mytml.compiled_mapping import compile_mappings as compile_mapping_files
+
+    start = time.perf_counter()
+    mapping_files = [(os.path.basename(path), read_file(path)) for path in args.mappings]
+    try:
+        compiled = compile_mapping_files(mapping_files)
+    except Exception as e:
+        print(f'{e.__class__.__name__} {e}', file=sys.stderr)
+        return 1
+
+    with open(args.output, 'wb') as f:
+        f.write(compiled)
+    print(f'{len(mapping_files)} mapping files compiled to {args.output}, {len(compiled)} bytes, '
+          f'{time.perf_counter() - start:.3f}s', file=sys.stderr)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='mytml', description='Visio diagram to Open Threat Model converter')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    convert_command = commands.add_parser('convert', help='convert diagrams to OTM')
+    convert_command.add_argument('sources', nargs='+',
+                                 help='.vsdx or parsed diagram files, or directories to search for them. '
+                                      'Parsed diagram files must come from a trusted source')
+    convert_command.add_argument('-m', '--mapping', dest='mappings', action='append', required=True,
+                                 help='mapping file, may be repeated')
+    convert_command.add_argument('--mapping-override', dest='overrides', action='append',
+                                 help='mapping file stacked on the mapping files, may be repeated')
+    convert_command.add_argument('-p', '--project-id', help='project id, defaults to the diagram file name')
+    convert_command.add_argument('-j', '--jobs', type=int, default=1, help='number of worker processes')
+    convert_command.add_argument('-o', '--output-dir',
+                                 help='write one .otm.json per diagram here instead of NDJSON to stdout')
+    convert_command.add_argument('--cache-dir', help='directory of the on-disk OTM cache')
+    convert_command.add_argument('--memory', action='store_true',
+                                 help='report the peak Python memory of every conversion, slows them down')
+    convert_command.add_argument('--validate-otm', action='store_true',
+                                 help='check every OTM against the Open Threat Model schema and its references')
+    convert_command.add_argument('--topology-only', action='store_true',
+                                 help='output trust zones, components and dataflows without their representations')
+    convert_command.add_argument('--parent-workers', type=int,
+                                 help='worker processes that infer the parents of large pages by tiles of the page')
+    add_limit_arguments(convert_command)
+    convert_command.set_defaults(handler=convert)
+
+    serve_command = commands.add_parser('serve', help='run the HTTP conversion service')
+    serve_command.add_argument('-m', '--mapping', dest='mappings', action='append', required=True,
+                               help='mapping file, may be repeated')
+    serve_command.add_argument('--host', default='127.0.0.1')
+    serve_command.add_argument('--port', type=int, default=8080)
+    serve_command.add_argument('-w', '--workers', type=int, default=2, help='number of worker processes')
+    serve_command.add_argument('--max-queue', type=int, default=16,
+                               help='conversions allowed to wait for a worker before rejecting new ones')
+    serve_command.add_argument('--cache-dir', help='directory of the on-disk OTM cache')
+    add_limit_arguments(serve_command)
+    serve_command.set_defaults(handler=serve)
+
+    parse_command = commands.add_parser('parse', help='parse diagrams once, to convert them with several mappings')
+    parse_command.add_argument('sources', nargs='+', help='.vsdx files or directories to search for them')
+    parse_command.add_argument('-o', '--output-dir', required=True,
+                               help=f'write one {PARSED_DIAGRAM_EXTENSION} per diagram here, accepted by convert')
+    parse_command.add_argument('--parent-workers', type=int,
+                               help='worker processes that infer the parents of large pages by tiles of the page')
+    parse_command.set_defaults(handler=parse)
+
+    inspect_command = commands.add_parser('inspect', help='count the shapes of diagrams and the labels they use, '
+                                                          'without converting them')
+    inspect_command.add_argument('sources', nargs='+', help='.vsdx files or directories to search for them')
+    inspect_command.add_argument('-m', '--mapping', dest='mappings', action='append',
+                                 help='mapping file, may be repeated, to report the labels no mapping covers')
+    inspect_command.add_argument('--mapping-override', dest='overrides', action='append',
+                                 help='mapping file stacked on the mapping files, may be repeated')
+    inspect_command.set_defaults(handler=inspect)
+
+    compile_command = commands.add_parser('compile-mappings',
+                                          help='validate and merge mapping files into a compiled mapping file')
+    compile_command.add_argument('mappings', nargs='+', help='mapping files, later ones override earlier ones')
+    compile_command.add_argument('-o', '--output', required=True,
+                                 help='compiled mapping file, accepted by -m in place of the mapping files. '
+                                      'Like them, it must come from a trusted source')
+    compile_command.set_defaults(handler=compile_mappings)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
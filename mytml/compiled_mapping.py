@@ -0,0 +1,100 @@
+import hashlib
+import marshal
+import struct
+from mytml import __version__
+from mytml.diagram import Trustzone
+from mytml.mapping import MappingLoader, MainMappingFileLoader, MappingDocument, MultipleMappingFileValidator, \
+    PUBLIC_CLOUD
+
+COMPILED_MAPPING_MAGIC = b'MYTMLMAP'
+COMPILED_MAPPING_FORMAT_VERSION = 2
+COMPILED_MAPPING_EXTENSION = '.mytmlmap'
+
+# magic, format version, marshal version and the sha256 of the payload
+_HEADER = struct.Struct(f'>{len(COMPILED_MAPPING_MAGIC)}sHH32s')
+
+
+def is_compiled_mapping(data) -> bool:
+    return isinstance(data, (bytes, bytearray, memoryview)) and bytes(data[:len(COMPILED_MAPPING_MAGIC)]) == \
+        COMPILED_MAPPING_MAGIC
+
+
+def compile_mappings(mapping_files: [tuple]) -> bytes:
+    """
+    Validates and merges the (name, data) mapping files and returns the compiled mapping artifact: the
+    merged mappings and the lookup tables MainMappingFileLoader builds from them, with the hashes of the
+    source files
+    """
+    mapping_documents = [MappingDocument(data) for _, data in mapping_files]
+    MultipleMappingFileValidator(mapping_documents).validate()
+    mapping_loader = MainMappingFileLoader(mapping_documents)
+    mapping_loader.load()
+
+    default_trustzone = mapping_loader.get_default_otm_trustzone()
+    payload = marshal.dumps({
+        "mytml_version": __version__,
+        "sources": [(name, hashlib.sha256(_to_bytes(data)).hexdigest()) for name, data in mapping_files],
+        "mappings": mapping_loader.mappings,
+        "component_mappings": mapping_loader.get_component_mappings(),
+        "trustzone_mappings": mapping_loader.get_trustzone_mappings(),
+        "component_patterns": mapping_loader.get_component_patterns(),
+        # no default trust zone in the mappings means the shared Public Cloud one
+        "default_trustzone": None if default_trustzone is PUBLIC_CLOUD else
+        {"id": default_trustzone.id, "name": default_trustzone.name, "type": default_trustzone.type},
+    })
+
+    header = _HEADER.pack(COMPILED_MAPPING_MAGIC, COMPILED_MAPPING_FORMAT_VERSION, marshal.version,
+                          hashlib.sha256(payload).digest())
+    return header + payload
+
+
+def read_compiled_mapping(data: bytes) -> dict:
+    """
+    The payload of a compiled mapping file. It is unmarshalled, and marshal is not secure against malicious
+    data: the checksum only detects a corrupt file, not a crafted one. Compiled mapping files must come from a
+    trusted source, like the mapping files they are compiled from.
+    """
+    if len(data) < _HEADER.size:
+        raise Exception('Compiled mapping file is not valid. Invalid size')
+
+    magic, format_version, marshal_version, checksum = _HEADER.unpack_from(data)
+    if magic != COMPILED_MAPPING_MAGIC:
+        raise Exception('Compiled mapping file is not valid. Unknown format')
+    if format_version != COMPILED_MAPPING_FORMAT_VERSION or marshal_version != marshal.version:
+        raise Exception(f'Compiled mapping file version {format_version}.{marshal_version} is not supported, '
+                        f'compile the mapping files again')
+
+    payload = memoryview(data)[_HEADER.size:]
+    if hashlib.sha256(payload).digest() != checksum:
+        raise Exception('Compiled mapping file is not valid. Checksum mismatch')
+
+    compiled = marshal.loads(payload)
+    if compiled["mytml_version"] != __version__:
+        raise Exception(f'Compiled mapping file was built by mytml {compiled["mytml_version"]}, '
+                        f'compile the mapping files again')
+    return compiled
+
+
+def _to_bytes(data) -> bytes:
+    return data.encode() if isinstance(data, str) else data
+
+
+class CompiledMappingLoader(MappingLoader):
+    """
+    The mappings read from a compiled mapping artifact, which are already validated, merged and indexed
+    """
+
+    def __init__(self, data: bytes):
+        compiled = read_compiled_mapping(data)
+
+        default_trustzone = compiled["default_trustzone"]
+        super().__init__(
+            mappings=compiled["mappings"],
+            component_mappings=compiled["component_mappings"],
+            trustzone_mappings=compiled["trustzone_mappings"],
+            default_otm_trustzone=PUBLIC_CLOUD if default_trustzone is None else
+            Trustzone(trustzone_id=default_trustzone["id"], name=default_trustzone["name"],
+                      type=default_trustzone["type"], attributes={"default": True}),
+            component_patterns=compiled["component_patterns"]
+        )
+        self.sources = compiled["sources"]
@@ -0,0 +1,28 @@
+class ConnectsIndex:
+    """
+    The Connects table of a page read once, giving for every shape id the connects it takes part in, in
+    page order, and the ids of the connector shapes
+    """
+
+    def __init__(self, connects=None):
+        self.connector_ids = set()
+        self.__connects = {}
+
+        for connect in connects or []:
+            self.add(connect)
+
+    @staticmethod
+    def from_page(page):
+        return ConnectsIndex(page.connects)
+
+    def add(self, connect):
+        self.connector_ids.add(connect.connector_shape_id)
+        self.__connects.setdefault(connect.connector_shape_id, []).append(connect)
+        if connect.shape_id != connect.connector_shape_id:
+            self.__connects.setdefault(connect.shape_id, []).append(connect)
+
+    def is_connector(self, shape_id) -> bool:
+        return shape_id in self.connector_ids
+
+    def get_connects(self, shape_id) -> list:
+        return self.__connects.get(shape_id, [])
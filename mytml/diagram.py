@@ -1,4 +1,3 @@
-from shapely.geometry import Polygon
 from enum import Enum
 from mytml.utils import normalize_label, remove_from_list
 
@@ -83,21 +82,54 @@ class Diagram:
         self.connectors = connectors
         self.limits = limits
 
+    def copy(self):
+        """
+        Copy whose components and lists can be changed, as pruning and mapping do, leaving this diagram as it
+        is. The representations and connectors are shared, they are not changed once built.
+        """
+        copies = {}
+        for component in self.components:
+            copies[id(component)] = DiagramComponent(
+                id=component.id, name=component.name, type=component.type, origin=component.origin,
+                trustzone=component.trustzone, representation=component.representation,
+                unique_id=component.unique_id
+            )
+        for component in self.components:
+            if component.parent is not None:
+                copies[id(component)].parent = copies.get(id(component.parent), component.parent)
+
+        return Diagram(list(copies.values()), list(self.connectors), self.limits)
+
+
+
+def is_label_mapped(component: DiagramComponent, normalized_mapped_labels: set, label_pattern_matcher=None) -> bool:
+    # what keeps a component when the diagram is pruned: a mapping label matching its name or its type
+    map_by_name = normalize_label(component.name) in normalized_mapped_labels
+    map_by_type = normalize_label(component.type) in normalized_mapped_labels
+    if map_by_name or map_by_type or label_pattern_matcher is None:
+        return map_by_name or map_by_type
+
+    return bool(label_pattern_matcher.match(normalize_label(component.name))
+                or label_pattern_matcher.match(normalize_label(component.type)))
 
 
 class DiagramPruner:
 
-    def __init__(self, diagram: Diagram, mapped_labels: [str]):
-        self.components = diagram.components
-        self.connectors = diagram.connectors
-        self.normalized_mapped_labels = [normalize_label(mapped_label) for mapped_label in mapped_labels]
+    def __init__(self, diagram: Diagram, mapped_labels: [str], label_pattern_matcher=None):
+        # a copy is pruned, so the parsed diagram can be mapped again with other mappings
+        self.diagram = diagram.copy()
+        self.components = self.diagram.components
+        self.connectors = self.diagram.connectors
+        self.normalized_mapped_labels = {normalize_label(mapped_label) for mapped_label in mapped_labels}
+        self.label_pattern_matcher = label_pattern_matcher
 
         self.__removed_components = []
 
-    def run(self):
+    def run(self) -> Diagram:
         self.__remove_unmapped_components()
         self.__prune_orphan_connectors()
         self.__restore_parents()
+        return self.diagram
 
     def __remove_unmapped_components(self):
         remove_from_list(
@@ -124,10 +156,7 @@ class DiagramPruner:
                 diagram_component.parent = removed_parents[diagram_component.parent.id]
 
     def __is_component_mapped(self, component: DiagramComponent):
-        map_by_name = normalize_label(component.name) in self.normalized_mapped_labels
-        map_by_type = normalize_label(component.type) in self.normalized_mapped_labels
-
-        return map_by_name or map_by_type
+        return is_label_mapped(component, self.normalized_mapped_labels, self.label_pattern_matcher)
 
     def __remove_component(self, component: DiagramComponent):
         self.components.remove(component)
@@ -1,9 +1,12 @@
 from mytml.diagram import DiagramComponent, DiagramConnector
-from mytml.utils import normalize_label, get_shape_text, get_master_shape_text, get_unique_id_text
+from mytml.utils import normalize_label, get_shape_text, get_master_shape_text, get_unique_id_text, \
+    get_begin_arrow, get_end_arrow
 
 class VisioComponentFactory:
     def create_component(self, shape, origin, representer):
-        return DiagramComponent(id = shape.ID, name=normalize_label(get_shape_text(shape)), type = normalize_label(get_master_shape_text(shape)), origin = origin , representation = representer.build_representation(shape), unique_id = get_unique_id_text(shape))
+        # without a representer the representation is left to be built later, if the component is kept
+        representation = representer.build_representation(shape) if representer else None
+        return DiagramComponent(id = shape.ID, name=normalize_label(get_shape_text(shape)), type = normalize_label(get_master_shape_text(shape)), origin = origin , representation = representation, unique_id = get_unique_id_text(shape))
 
 class VisioConnectorFactory:
 
@@ -16,38 +19,38 @@ class VisioConnectorFactory:
         return True
 
     @staticmethod
-    def _is_bidirectional_connector(shape):
+    def _is_arrow(arrow_value):
+        return (
+            arrow_value is not None
+            and str(arrow_value).isnumeric()
+            and arrow_value != "0"
+        )
+
+    @staticmethod
+    def _is_bidirectional_connector(shape, begin_arrow, end_arrow):
         if shape.master_page.name is not None and "Double Arrow" in shape.master_page.name:
             return True
-        for arrow_value in [shape.cell_value(att) for att in ["BeginArrow", "EndArrow"]]:
-            if (
-                arrow_value is None
-                or not str(arrow_value).isnumeric()
-                or arrow_value == "0"
-            ):
-                return False
-        return True
+        return VisioConnectorFactory._is_arrow(begin_arrow) and VisioConnectorFactory._is_arrow(end_arrow)
 
     @staticmethod
     def _is_created_from(connector):
         return connector.from_rel == "BeginX"
 
     @staticmethod
-    def _connector_has_arrow_in_origin(shape):
-        begin_arrow_value = shape.cell_value("BeginArrow")
-        return (
-            begin_arrow_value is not None
-            and str(begin_arrow_value).isnumeric()
-            and begin_arrow_value != "0"
-        )
+    def _connector_has_arrow_in_origin(begin_arrow):
+        return VisioConnectorFactory._is_arrow(begin_arrow)
 
 
-    def create_connector(self, shape):
-        connected_shapes = shape.connects
+    def create_connector(self, shape, connected_shapes=None):
+        if connected_shapes is None:
+            connected_shapes = shape.connects
         if not self._is_valid_connector(connected_shapes):
             return None
 
-        if self._is_bidirectional_connector(shape):
+        begin_arrow = get_begin_arrow(shape)
+        end_arrow = get_end_arrow(shape)
+
+        if self._is_bidirectional_connector(shape, begin_arrow, end_arrow):
             return DiagramConnector(
                 shape.ID,
                 connected_shapes[0].shape_id,
@@ -55,7 +58,7 @@ class VisioConnectorFactory:
                 True,
             )
 
-        has_arrow_in_origin = self._connector_has_arrow_in_origin(shape)
+        has_arrow_in_origin = self._connector_has_arrow_in_origin(begin_arrow)
 
         if (not has_arrow_in_origin and self._is_created_from(connected_shapes[0])) or (
             has_arrow_in_origin and self._is_created_from(connected_shapes[1])
@@ -0,0 +1,59 @@
+from array import array
+from vsdx import Shape
+from mytml.utils import get_x_center, get_y_center, get_width, get_height
+
+
+class GeometryTable:
+    """
+    Numeric geometry of the shapes of a page, extracted in a single pass and stored column-wise
+    """
+
+    def __init__(self):
+        self.rows = {}
+        self.center_x = array('d')
+        self.center_y = array('d')
+        self.width = array('d')
+        self.height = array('d')
+
+    @staticmethod
+    def from_shapes(shapes: [Shape]):
+        table = GeometryTable()
+        for shape in shapes:
+            table.add(shape)
+        return table
+
+    def __len__(self):
+        return len(self.center_x)
+
+    def __contains__(self, shape_id):
+        return shape_id in self.rows
+
+    def add(self, shape: Shape):
+        self.rows[shape.ID] = len(self.center_x)
+        center_x, center_y = shape.center_x_y
+        self.center_x.append(float(center_x))
+        self.center_y.append(float(center_y))
+        self.width.append(get_width(shape))
+        self.height.append(get_height(shape))
+
+    def get_center(self, shape_id) -> tuple:
+        row = self.rows[shape_id]
+        return self.center_x[row], self.center_y[row]
+
+    def get_limits(self, shape_id) -> tuple:
+        return self.__row_limits(self.rows[shape_id])
+
+    def iter_limits(self):
+        for row in range(len(self.center_x)):
+            yield self.__row_limits(row)
+
+    def __row_limits(self, row) -> tuple:
+        center_x = self.center_x[row]
+        center_y = self.center_y[row]
+        width = self.width[row]
+        height = self.height[row]
+
+        return (center_x - (width / 2), center_y - (height / 2)), (
+            center_x + (width / 2),
+            center_y + (height / 2),
+        )
@@ -0,0 +1,155 @@
+import hashlib
+import xml.etree.ElementTree as ET
+from mytml.diagram import DiagramComponent, DiagramConnector, DiagramComponentOrigin
+from mytml.master_cache import get_master_page_digest
+from mytml.connects_index import ConnectsIndex
+from mytml.parent_calculator import ParentCalculator, is_contained
+from mytml.vsdx_parser import VsdxParser
+
+
+def calculate_shape_digest(shape, connects: ConnectsIndex) -> str:
+    digest = hashlib.sha1(ET.tostring(shape.xml))
+    master_page = shape.master_page
+    if master_page:
+        digest.update(get_master_page_digest(master_page).encode())
+    for connect in connects.get_connects(shape.ID):
+        digest.update(repr((connect.from_id, connect.from_rel, connect.to_id, connect.to_rel)).encode())
+    return digest.hexdigest()
+
+
+def get_limits_key(limits) -> tuple:
+    return limits.x_floor, limits.y_floor, limits.x_top, limits.y_top
+
+
+def copy_component(component: DiagramComponent) -> DiagramComponent:
+    return DiagramComponent(
+        id=component.id,
+        name=component.name,
+        type=component.type,
+        origin=component.origin,
+        representation=component.representation,
+        unique_id=component.unique_id,
+    )
+
+
+def copy_connector(connector: DiagramConnector) -> DiagramConnector:
+    return DiagramConnector(connector.id, connector.from_id, connector.to_id, connector.bidirectional, connector.name)
+
+
+class ShapeRecord:
+    def __init__(self, shape_id, digest, component=None, connector=None):
+        self.shape_id = shape_id
+        self.digest = digest
+        self.component = component
+        self.connector = connector
+
+
+class ConversionState:
+    """
+    Snapshot of a parsed diagram, taken before pruning, that a later conversion of a revised
+    version of the same diagram can reuse
+    """
+
+    def __init__(self, limits, records: dict, parents: dict):
+        self.limits = limits
+        self.records = records
+        self.parents = parents
+
+    def get_record(self, shape_id) -> ShapeRecord:
+        return self.records.get(shape_id)
+
+    def component_ids(self) -> set:
+        return {shape_id for shape_id, record in self.records.items() if record.component}
+
+
+class IncrementalVsdxParser(VsdxParser):
+    """
+    VsdxParser that reuses components, connectors and parents of the shapes whose content has not
+    changed since the previous conversion
+    """
+
+    def __init__(self, component_factory, connector_factory, previous_state: ConversionState = None,
+                 budget=None, parent_workers: int = None):
+        super().__init__(component_factory, connector_factory, budget, parent_workers=parent_workers)
+        self.previous_state = previous_state
+        self.state = None
+
+        self.__records = {}
+        self.__rebuilt_ids = set()
+        self.__same_limits = False
+
+    def parse(self, diagram_filename):
+        diagram = super().parse(diagram_filename)
+
+        parents = {c.id: c.parent.id if c.parent else None for c in self._visio_components}
+        self.state = ConversionState(self._diagram_limits, self.__records, parents)
+
+        return diagram
+
+    def _load_page_elements(self):
+        self.__same_limits = self.previous_state is not None and \
+            get_limits_key(self.previous_state.limits) == get_limits_key(self._diagram_limits)
+        super()._load_page_elements()
+
+    def _load_page_element(self, shape):
+        digest = calculate_shape_digest(shape, self._connects)
+        previous = self.previous_state.get_record(shape.ID) if self.previous_state else None
+
+        if previous and previous.digest == digest and self.__is_reusable(previous):
+            self.__reuse(previous)
+            self.__records[shape.ID] = previous
+            return
+
+        components_count, connectors_count = len(self._visio_components), len(self._visio_connectors)
+        super()._load_page_element(shape)
+        component = copy_component(self._visio_components[-1]) \
+            if len(self._visio_components) > components_count else None
+        connector = copy_connector(self._visio_connectors[-1]) \
+            if len(self._visio_connectors) > connectors_count else None
+
+        self.__records[shape.ID] = ShapeRecord(shape.ID, digest, component, connector)
+        self.__rebuilt_ids.add(shape.ID)
+
+    def __is_reusable(self, record: ShapeRecord) -> bool:
+        # zone representations are built from the diagram limits
+        if record.component and record.component.origin == DiagramComponentOrigin.BOUNDARY:
+            return self.__same_limits
+        return True
+
+    def __reuse(self, record: ShapeRecord):
+        if record.component:
+            self._visio_components.append(copy_component(record.component))
+        if record.connector:
+            self._visio_connectors.append(copy_connector(record.connector))
+
+    def _calculate_parents(self):
+        if not self.previous_state or not self.__same_order():
+            super()._calculate_parents()
+            return
+
+        components_by_id = {c.id: c for c in self._visio_components}
+        changed_ids = {c.id for c in self._visio_components if c.id in self.__rebuilt_ids}
+        removed_ids = self.previous_state.component_ids() - components_by_id.keys()
+        changed_components = [components_by_id[changed_id] for changed_id in changed_ids]
+
+        for component in self._visio_components:
+            if self.__needs_parent(component, changed_ids | removed_ids, changed_components):
+                component.parent = ParentCalculator(component, self._budget).calculate_parent(self._visio_components)
+            else:
+                component.parent = components_by_id.get(self.previous_state.parents.get(component.id))
+
+    def __needs_parent(self, component, affected_ids: set, changed_components: list) -> bool:
+        if component.id in affected_ids or component.id not in self.previous_state.parents:
+            return True
+
+        if self.previous_state.parents[component.id] in affected_ids:
+            return True
+
+        self._budget.count_containment_tests(len(changed_components))
+        return any(is_contained(changed, component) for changed in changed_components)
+
+    def __same_order(self) -> bool:
+        # parents with the same area are chosen by page order, so it must not have changed
+        previous_ids = self.previous_state.records.keys()
+        current_ids = self.__records.keys()
+        return [i for i in previous_ids if i in current_ids] == [i for i in current_ids if i in previous_ids]
@@ -0,0 +1,230 @@
+import xml.etree.ElementTree as ET
+from zipfile import ZipFile
+from mytml.diagram import DiagramComponent, DiagramComponentOrigin
+from mytml.utils import VISIO_NAMESPACE, BOUNDARY_SHAPE_NAME, normalize_label, normalize_unique_id
+
+# same as vsdx.r_namespace
+RELATIONSHIPS_NAMESPACE = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+PAGES_FOLDER = 'visio/pages/'
+MASTERS_FOLDER = 'visio/masters/'
+
+
+def read_xml(package: ZipFile, path: str):
+    try:
+        return ET.fromstring(package.read(path))
+    except KeyError:
+        return None
+
+
+def read_relationship_targets(package: ZipFile, folder: str, filename: str) -> dict:
+    rels = read_xml(package, f'{folder}_rels/{filename}.rels')
+    return {} if rels is None else {rel.get('Id'): folder + rel.get('Target') for rel in rels}
+
+
+def get_rel_id(element) -> str:
+    return element.find(f'{VISIO_NAMESPACE}Rel').attrib[f'{RELATIONSHIPS_NAMESPACE}id']
+
+
+def get_child_shapes(shape):
+    # the shapes of a group are in its Shapes element, a page or master Shapes element holds them directly
+    parent = shape.find(f'{VISIO_NAMESPACE}Shapes') if shape.get('Type') == 'Group' else shape
+    return [] if parent is None or not len(parent) else [child for child in parent if 'Shape' in child.tag]
+
+
+def iter_all_shapes(shape):
+    for child in get_child_shapes(shape):
+        yield child
+        yield from iter_all_shapes(child)
+
+
+def get_own_text(shape):
+    text_element = shape.find(f'{VISIO_NAMESPACE}Text')
+    return None if text_element is None else ''.join(text_element.itertext())
+
+
+class InspectedMaster:
+    def __init__(self, unique_id, path):
+        self.unique_id = unique_id
+        self.path = path
+        self.shapes_xml = None
+        # (text, shape text) of its shapes, by master shape id
+        self.texts = {}
+
+
+class VisioPackageInspector:
+    """
+    Reads the first page of a vsdx file and the masters its shapes use straight from the XML of the
+    package, resolving the texts, types and unique ids of its shapes as VsdxParser and the component
+    factory do through vsdx. The XML of a master is only read when a shape takes its text from it.
+    """
+
+    def __init__(self, package: ZipFile):
+        self.package = package
+        self.page = self.__read_first_page()
+        self.connector_ids = {connect.get('FromSheet') for connect in self.page.iter(f'{VISIO_NAMESPACE}Connect')}
+        self.masters = self.__read_masters()
+
+    def __read_first_page(self):
+        pages = read_xml(self.package, f'{PAGES_FOLDER}pages.xml')
+        if pages is None or not len(pages):
+            raise Exception('Diagram file is not valid. It has no pages')
+        targets = read_relationship_targets(self.package, PAGES_FOLDER, 'pages.xml')
+        return read_xml(self.package, targets[get_rel_id(pages[0])])
+
+    def __read_masters(self) -> dict:
+        masters_xml = read_xml(self.package, f'{MASTERS_FOLDER}masters.xml')
+        if masters_xml is None:
+            return {}
+        targets = read_relationship_targets(self.package, MASTERS_FOLDER, 'masters.xml')
+
+        masters = {}
+        for master in masters_xml:
+            # vsdx returns the first master with an id
+            masters.setdefault(master.get('ID'), InspectedMaster(master.get('UniqueID'), targets[get_rel_id(master)]))
+        return masters
+
+    def get_shapes(self):
+        shapes = self.page.find(f'{VISIO_NAMESPACE}Shapes')
+        return [] if shapes is None else [shape for shape in shapes if 'Shape' in shape.tag]
+
+    def get_master_texts(self, master_id, master_shape_id):
+        master = self.masters.get(master_id)
+        if master is None:
+            return None
+
+        if master_shape_id not in master.texts:
+            master.texts[master_shape_id] = self.__read_master_texts(master, master_shape_id)
+        return master.texts[master_shape_id]
+
+    def __read_master_texts(self, master: InspectedMaster, master_shape_id) -> tuple:
+        if master.shapes_xml is None:
+            master.shapes_xml = read_xml(self.package, master.path).find(f'{VISIO_NAMESPACE}Shapes')
+        master_shapes = get_child_shapes(master.shapes_xml) if master.shapes_xml is not None else []
+        if not master_shapes:
+            return '', ''
+
+        master_shape = master_shapes[0]
+        if master_shape_id is not None:
+            master_shape = next((shape for shape in iter_all_shapes(master_shape)
+                                 if shape.get('ID') == master_shape_id), None)
+        if master_shape is None:
+            return '', ''
+
+        text = get_own_text(master_shape) or ''
+        shape_text = text or ''.join(get_own_text(child) or '' for child in get_child_shapes(master_shape))
+        return text, shape_text.strip()
+
+    def get_text(self, shape, master_id) -> str:
+        text = get_own_text(shape)
+        if text is not None:
+            return text
+
+        master_texts = self.get_master_texts(master_id, shape.get('MasterShape')) if master_id else None
+        return master_texts[0] if master_texts else ''
+
+    def get_shape_text(self, shape, master_id) -> str:
+        result = self.get_text(shape, master_id)
+        if not result:
+            # the sub shapes without master take the one of the shape
+            result = ''.join(self.get_text(child, child.get('Master', master_id))
+                             for child in get_child_shapes(shape))
+        if not result:
+            result = self.get_master_shape_text(shape, master_id)
+        return (result or '').strip()
+
+    def get_master_shape_text(self, shape, master_id) -> str:
+        master_texts = self.get_master_texts(master_id, shape.get('MasterShape'))
+        return master_texts[1] if master_texts else ''
+
+    def get_unique_id(self, master_id) -> str:
+        master = self.masters.get(master_id)
+        if master is None or not master.unique_id:
+            return ''
+        return normalize_unique_id(master.unique_id.strip())
+
+    def create_component(self, shape, origin: DiagramComponentOrigin) -> DiagramComponent:
+        master_id = shape.get('Master')
+        return DiagramComponent(id=shape.get('ID'), name=normalize_label(self.get_shape_text(shape, master_id)),
+                                type=normalize_label(self.get_master_shape_text(shape, master_id)),
+                                origin=origin, unique_id=self.get_unique_id(master_id))
+
+
+class DiagramInspection:
+    """
+    What a diagram holds and which of it the mappings cover: the number of shapes of its page and of the
+    connectors, boundaries and components among them, and the labels and master unique ids of its
+    boundaries and components. Without mappings, the unmapped ones are None.
+    """
+
+    def __init__(self):
+        self.shapes = 0
+        self.connectors = 0
+        self.boundaries = 0
+        self.components = 0
+        self.labels = set()
+        self.unique_ids = set()
+        self.unmapped_components = None
+        self.unmapped_labels = None
+        self.unmapped_unique_ids = None
+
+    def add_component(self, component: DiagramComponent):
+        if component.origin == DiagramComponentOrigin.BOUNDARY:
+            self.boundaries += 1
+        else:
+            self.components += 1
+        self.labels.update(label for label in (component.name, component.type) if label)
+        if component.unique_id:
+            self.unique_ids.add(component.unique_id)
+
+    def check_mappings(self, components: [DiagramComponent], mapped_labels):
+        self.unmapped_components = sum(1 for component in components
+                                       if component.origin == DiagramComponentOrigin.SIMPLE_COMPONENT
+                                       and not mapped_labels.matches(component))
+        self.unmapped_labels = {label for label in self.labels if not mapped_labels.matches_label(label)}
+        self.unmapped_unique_ids = {unique_id for unique_id in self.unique_ids
+                                    if not mapped_labels.matches_unique_id(unique_id)}
+
+    def json(self) -> dict:
+        inspection = {
+            "shapes": self.shapes,
+            "connectors": self.connectors,
+            "boundaries": self.boundaries,
+            "components": self.components,
+            "labels": sorted(self.labels),
+            "uniqueIds": sorted(self.unique_ids)
+        }
+        if self.unmapped_components is not None:
+            inspection["unmappedComponents"] = self.unmapped_components
+            inspection["unmappedLabels"] = sorted(self.unmapped_labels)
+            inspection["unmappedUniqueIds"] = sorted(self.unmapped_unique_ids)
+        return inspection
+
+
+def inspect_diagram(diagram_filename, mapped_labels=None) -> DiagramInspection:
+    """
+    Inspects the first page of a vsdx file reading only its page and masters XML, without building the
+    geometry of the shapes, inferring their parents nor mapping them. The shapes are told apart as
+    VsdxParser does: the connectors first, then the boundaries and then the shapes with text.
+    """
+    inspection = DiagramInspection()
+    with ZipFile(diagram_filename) as package:
+        inspector = VisioPackageInspector(package)
+
+        components = []
+        for shape in inspector.get_shapes():
+            inspection.shapes += 1
+            if shape.get('ID') in inspector.connector_ids:
+                inspection.connectors += 1
+                continue
+
+            shape_name = shape.get('NameU') or shape.get('Name')
+            if shape_name is not None and BOUNDARY_SHAPE_NAME in shape_name:
+                components.append(inspector.create_component(shape, DiagramComponentOrigin.BOUNDARY))
+            elif inspector.get_shape_text(shape, shape.get('Master')):
+                components.append(inspector.create_component(shape, DiagramComponentOrigin.SIMPLE_COMPONENT))
+
+    for component in components:
+        inspection.add_component(component)
+    if mapped_labels is not None:
+        inspection.check_mappings(components, mapped_labels)
+    return inspection
@@ -0,0 +1,122 @@
+import re
+from fnmatch import translate
+from functools import lru_cache
+
+REGEX_KEY = '$regex'
+GLOB_KEY = '$glob'
+
+# the flags a pattern sets for the whole of it, which a combined regex only allows at its very start
+GLOBAL_FLAGS_REGEX = re.compile(r'\(\?([aiLmsux]+)\)')
+OCTAL_DIGITS = '01234567'
+# texts whose match is kept by every matcher, diagrams repeat the same names, types and unique ids
+LABEL_MATCH_CACHE_SIZE = 4096
+
+
+def is_label_pattern(label) -> bool:
+    # exact labels are strings, patterns are {$regex: ...} or {$glob: ...}
+    return isinstance(label, dict)
+
+
+def get_pattern_regex(label: dict) -> str:
+    if REGEX_KEY in label:
+        return scope_global_flags(label[REGEX_KEY])
+    if GLOB_KEY in label:
+        return translate(label[GLOB_KEY])
+    raise Exception(f'Mapping files are not valid. Unknown label pattern {label}')
+
+
+def scope_global_flags(regex: str) -> str:
+    # (?i)custom.* becomes (?i:custom.*), which keeps its meaning inside the combined regex
+    flags = ''
+    while match := GLOBAL_FLAGS_REGEX.match(regex):
+        flags += match.group(1)
+        regex = regex[match.end():]
+    if not flags:
+        return regex
+    # a verbose comment at the end would swallow the closing parenthesis
+    return f'(?{flags}:{regex}\n)' if 'x' in flags else f'(?{flags}:{regex})'
+
+
+def has_numbered_group_reference(regex: str) -> bool:
+    """
+    Whether the regex refers to a group by its number, as a \\1 backreference or a (?(1)...) conditional. The
+    groups of a pattern are numbered differently in the combined regex, so those would refer to other groups.
+    """
+    i, in_class = 0, False
+    while i < len(regex):
+        if regex[i] == '\\':
+            digits = regex[i + 1:i + 4]
+            # \0 and three octal digits are octal escapes, in a class any escaped number is
+            if not in_class and digits[:1] and digits[:1] in '123456789' and \
+                    not (len(digits) == 3 and all(digit in OCTAL_DIGITS for digit in digits)):
+                return True
+            i += 2
+            continue
+        if in_class:
+            in_class = regex[i] != ']'
+        elif regex[i] == '[':
+            in_class = True
+            # a ] right after [ or [^ is a member of the class
+            i += 2 if regex.startswith('[^]', i) else 1 if regex.startswith('[]', i) else 0
+        elif regex.startswith('(?(', i) and regex[i + 3:i + 4].isdigit():
+            return True
+        i += 1
+    return False
+
+
+def validate_label_patterns(mapping: dict):
+    patterns = []
+    for component in (mapping or {}).get('components') or []:
+        label = component.get('label')
+        if not is_label_pattern(label):
+            continue
+        regex = get_pattern_regex(label)
+        try:
+            re.compile(regex)
+        except re.error as e:
+            raise Exception(f'Mapping files are not valid. Invalid label pattern {label} {e}')
+        if has_numbered_group_reference(regex):
+            raise Exception(f'Mapping files are not valid. Label pattern {label} refers to a group by number, '
+                            f'refer to it by name with (?P=name)')
+        patterns.append((regex, component))
+    # the patterns are matched all at once, so they must also compile together
+    LabelPatternMatcher(patterns)
+
+
+class LabelPatternMatcher:
+    """
+    Matches a text against all the label patterns at once, with a single regex that is the alternation of
+    them in priority order, and returns the value of the first pattern that matches the whole text. Without a
+    match, the texts go to the matcher of the mappings these patterns are stacked on, if any.
+    """
+
+    def __init__(self, patterns: [tuple], base=None):
+        # (regex, value) pairs, the first pattern that matches wins
+        self.values = [value for _, value in patterns]
+        self.base = base
+        self.__regex = self.__compile(patterns) if patterns else None
+        # bounded, as the matcher of a service lives as long as it does
+        self.__cached_match = lru_cache(maxsize=LABEL_MATCH_CACHE_SIZE)(self.__match)
+
+    @staticmethod
+    def __compile(patterns: [tuple]):
+        # the group of each pattern encloses any group of its own, so it is the last one matched
+        try:
+            return re.compile('|'.join(f'(?P<_{i}>{regex})' for i, (regex, _) in enumerate(patterns)))
+        except re.error as e:
+            raise Exception(f'Mapping files are not valid. The label patterns cannot be combined, they may not '
+                            f'use the same group names or refer to groups by number {e}')
+
+    def match(self, text):
+        if not text:
+            return None
+        return self.__cached_match(text)
+
+    def __match(self, text):
+        value = None
+        match = self.__regex.fullmatch(text) if self.__regex is not None else None
+        if match is not None:
+            value = self.values[int(match.lastgroup[1:])]
+        elif self.base is not None:
+            value = self.base.match(text)
+        return value
@@ -1,18 +1,37 @@
-from mytml.vsdx_parser import VsdxParser 
 from mytml.factory import VisioComponentFactory, VisioConnectorFactory
+from mytml.budget import BudgetExceededError
 
 class Loader:
-    def __init__(self, source):
+    def __init__(self, source, incremental=False, previous_state=None, streaming=False, budget=None,
+                 mapped_labels=None, parent_workers=None):
         self.visio = None
         self.source = source
-        self.parser = VsdxParser(VisioComponentFactory(), VisioConnectorFactory())
+        self.incremental = incremental or previous_state is not None
+        # the parsers load vsdx and shapely, which are only needed once a diagram is converted
+        if self.incremental:
+            from mytml.incremental import IncrementalVsdxParser
+            self.parser = IncrementalVsdxParser(VisioComponentFactory(), VisioConnectorFactory(), previous_state,
+                                                budget, parent_workers)
+        elif streaming:
+            from mytml.streaming import StreamingVsdxParser
+            self.parser = StreamingVsdxParser(VisioComponentFactory(), VisioConnectorFactory(), budget,
+                                              parent_workers)
+        else:
+            from mytml.vsdx_parser import VsdxParser
+            self.parser = VsdxParser(VisioComponentFactory(), VisioConnectorFactory(), budget, mapped_labels,
+                                     parent_workers)
 
     def get_visio(self):
         return self.visio
 
+    def get_state(self):
+        return self.parser.state if self.incremental else None
+
     def load(self):
         try:
             self.visio = self.parser.parse(self.source.name)
+        except BudgetExceededError:
+            raise
         except Exception as e:
             print(e)
             raise Exception(f"Diagram file is not valid {e.__class__.__name__} {e.__str__()}")
\ No newline at end of file
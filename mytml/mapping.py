@@ -1,17 +1,17 @@
 from abc import ABCMeta
-import os
-import yaml
+import hashlib
+from collections import ChainMap
 import json 
-import jmespath
-import jsonschema
-import pkg_resources
-from deepmerge import always_merger
-from mytml.utils import normalize_unique_id, deterministic_uuid
+from importlib import resources
+from mytml.utils import normalize_label, normalize_unique_id, deterministic_uuid
 from mytml.diagram import Trustzone
+from mytml.label_pattern import LabelPatternMatcher, is_label_pattern, get_pattern_regex, validate_label_patterns
 
 MAX_SIZE = 5 * 1024 * 1024 
 MIN_SIZE = 5
 
+SCHEMA_FILENAME = 'diagram_mapping_schema.json'
+
 PUBLIC_CLOUD_NAME = 'Public Cloud'
 PUBLIC_CLOUD = Trustzone(trustzone_id=deterministic_uuid(PUBLIC_CLOUD_NAME), name=PUBLIC_CLOUD_NAME,
                          type='b61d6911-338d-46a8-9f39-8dcd24abfe91', attributes={"default": True})
@@ -43,27 +43,86 @@ def validate_schema(mapping_file):
         raise Exception('Mapping files are not valid')
 
 
-def read_mapping_file(mapping_file: bytes):
+def read_mapping_file(mapping_file):
     try:
-        return yaml.load(mapping_file, Loader=yaml.SafeLoader)
+        return as_mapping_document(mapping_file).typed()
     except Exception as e:
         raise Exception('Error reading the mapping file. The mapping files are not valid.')
 
 
+def get_yaml_loader():
+    import yaml
+
+    # libyaml's parser when it is installed, the tags it resolves are the same as the Python one
+    return getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+def as_mapping_document(mapping_file):
+    return mapping_file if isinstance(mapping_file, MappingDocument) else MappingDocument(mapping_file)
+
+
+class MappingDocument:
+    """
+    A mapping file parsed once into its YAML node tree, from which both the typed document the schema
+    validates (SafeLoader semantics) and the document that is merged (BaseLoader semantics, every
+    scalar a string) are built
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.__parsed = False
+        self.__node = None
+        self.__untyped = None
+
+    def typed(self):
+        from yaml.constructor import SafeConstructor
+
+        self.__parse()
+        return SafeConstructor().construct_document(self.__node) if self.__node is not None else None
+
+    def untyped(self):
+        self.__parse()
+        return self.__untyped
+
+    def __parse(self):
+        import yaml
+        from yaml.constructor import BaseConstructor
+
+        if self.__parsed:
+            return
+
+        text = self.data if isinstance(self.data, str) else self.data.decode()
+        self.__node = yaml.compose(text, Loader=get_yaml_loader())
+        # built before the typed document, whose merge keys (<<) are flattened in the node tree itself
+        self.__untyped = BaseConstructor().construct_document(self.__node) if self.__node is not None else None
+        self.__parsed = True
+
+
+def search(expression: str, data):
+    import jmespath
+
+    return jmespath.search(expression, data)
+
+
 def validate_mapping_file(mapping_file):
-    validate_size(mapping_file)
-    validate_type(mapping_file)
-    validate_schema(mapping_file)
+    mapping_document = as_mapping_document(mapping_file)
+    validate_size(mapping_document.data)
+    validate_type(mapping_document.data)
+    validate_schema(mapping_document)
+    validate_label_patterns(mapping_document.untyped())
 
 
 
 class Schema:
-    def __init__(self):
-        self.schema_file = self.__load_schema("mytml/data/diagram_mapping_schema.json")
+    def __init__(self, schema_path=None):
+        # the packaged schema is found wherever mytml is installed, whatever the working directory
+        self.schema_file = self.__load_schema(schema_path or resources.files('mytml') / 'data' / SCHEMA_FILENAME)
         self.errors = ""
         self.valid = None
 
     def validate(self, document):
+        import jsonschema
+
         try:
             jsonschema.validate(document, self.schema_file)
             self.valid = True
@@ -78,19 +137,49 @@ class Schema:
         return json.dumps(self.schema_file, indent=2)
 
     def __load_schema(self, schema_path):
+        import yaml
+
         with open(schema_path, "r") as f:
             return yaml.load(f, Loader=yaml.BaseLoader)
 
     @staticmethod
     def from_package(package: str, filename: str):
-        schema_path = pkg_resources.resource_filename(package, os.path.join('resources/schemas', filename))
-        return Schema(schema_path)
+        return Schema(resources.files(package) / 'resources' / 'schemas' / filename)
+
+
+
+class MappedLabels:
+    """
+    The normalized labels and unique ids the mappings may match diagram components by, to tell the shapes
+    no mapping can match before their geometry is built
+    """
+
+    def __init__(self, labels: [str], unique_ids: [str], base=None, pattern_matcher: LabelPatternMatcher = None):
+        self.labels = frozenset(normalize_label(label) for label in labels)
+        self.unique_ids = frozenset(normalize_label(unique_id) for unique_id in unique_ids)
+        # the MappedLabels of the mappings these are stacked on
+        self.base = base
+        self.pattern_matcher = pattern_matcher
+
+    def matches(self, component) -> bool:
+        return self.matches_label(component.name) or self.matches_label(component.type) or \
+            self.matches_unique_id(component.unique_id)
+
+    def matches_label(self, label) -> bool:
+        if label in self.labels or (self.pattern_matcher is not None and self.pattern_matcher.match(label)):
+            return True
+        return self.base is not None and self.base.matches_label(label)
+
+    def matches_unique_id(self, unique_id) -> bool:
+        if unique_id in self.unique_ids or (self.pattern_matcher is not None and self.pattern_matcher.match(unique_id)):
+            return True
+        return self.base is not None and self.base.matches_unique_id(unique_id)
 
 
 
 class MappingFileLoader(metaclass = ABCMeta):
     def __init__(self, mapping_files_data):
-        self.mapping_files = mapping_files_data
+        self.mapping_files = [as_mapping_document(mapping_file) for mapping_file in mapping_files_data or []]
         self.map = {}
 
     def load(self):
@@ -98,14 +187,13 @@ class MappingFileLoader(metaclass = ABCMeta):
             msg = "Mapping File is empty"
             raise Exception(msg)
         
-        validate_size(self.mapping_files[0])
+        validate_size(self.mapping_files[0].data)
 
         try:
-            for mapping_file_data in self.mapping_files:
-                if not mapping_file_data:
+            for mapping_document in self.mapping_files:
+                if not mapping_document.data:
                     continue 
-                data = mapping_file_data if isinstance(mapping_file_data, str) else mapping_file_data.decode()
-                self._load(yaml.load(data, Loader=yaml.BaseLoader))
+                self._load(mapping_document.untyped())
         except Exception as e:
             raise Exception(f"Error loading the mapping file {e.__class__.__name__} {str(e)}")
         return self.map
@@ -114,21 +202,149 @@ class MappingFileLoader(metaclass = ABCMeta):
         return self.map 
 
     def _load(self, mapping):
+        from deepmerge import always_merger
+
         always_merger.merge(self.map, mapping)
 
 
 
-class MainMappingFileLoader:
+def get_component_identifier(component: dict) -> str:
+    identifier = component.get('id', component['label'])
+    return normalize_unique_id(identifier)
+
+
+def get_exact_labels(mappings_list: list) -> list:
+    return [mapping['label'] for mapping in mappings_list if not is_label_pattern(mapping['label'])]
+
+
+def build_component_mappings(component_mappings_list: list) -> dict:
+    # the components mapped by a label pattern are found by the pattern matcher, unless they have an id
+    keyed_mappings = [cp for cp in component_mappings_list if 'id' in cp or not is_label_pattern(cp['label'])]
+    return dict(zip([get_component_identifier(cp) for cp in keyed_mappings], keyed_mappings))
+
+
+def build_component_patterns(component_mappings_list: list) -> list:
+    return [(get_pattern_regex(cp['label']), cp) for cp in component_mappings_list if is_label_pattern(cp['label'])]
+
+
+def build_component_pattern_matcher(component_patterns: list, base: LabelPatternMatcher = None):
+    # the last mapping defined wins, as with exact labels
+    return LabelPatternMatcher([(regex, cp) for regex, cp in reversed(component_patterns) if 'id' not in cp], base)
+
 
+def build_label_pattern_matcher(component_patterns: list, base: LabelPatternMatcher = None):
+    return LabelPatternMatcher(list(reversed(component_patterns)), base)
+
+
+def build_trustzone_mappings(trustzone_mappings_list: list) -> dict:
+    return dict(zip([tz['label'] for tz in trustzone_mappings_list], trustzone_mappings_list))
+
+
+def find_default_otm_trustzone(trustzone_mappings_list: list):
+    default_trustzones = [v for v in trustzone_mappings_list if 'default' in v and v['default']]
+    default_otm_trustzone = default_trustzones[-1] if len(default_trustzones) > 0 else None
+    if default_otm_trustzone:
+        name = default_otm_trustzone['label']
+        return Trustzone(trustzone_id=deterministic_uuid(name), name=name, type=default_otm_trustzone['type'],
+                         attributes={"default": True})
+    return None
+
+
+class MappingLoader:
+    """
+    The mappings as the mapping of a diagram reads them: the component and trust zone mappings by label, the
+    label patterns and the default trust zone. The loaders of mapping files, of compiled mappings and of
+    layered mappings all set them through this initializer.
+    """
+
+    def __init__(self, mappings=None, component_mappings=None, trustzone_mappings=None, default_otm_trustzone=None,
+                 component_patterns=None):
+        self.mappings = mappings
+        self.component_mappings = component_mappings
+        self.trustzone_mappings = trustzone_mappings
+        self.default_otm_trustzone = default_otm_trustzone
+        self.component_patterns = component_patterns or []
+        # built on first use
+        self._all_labels = None
+        self._mapped_labels = None
+        self._component_pattern_matcher = None
+        self._label_pattern_matcher = None
+        self._fingerprint = None
+
+    def load(self):
+        # the mappings are ready once built, except for the ones of mapping files
+        pass
+
+    def get_all_labels(self):
+        if self._all_labels is None:
+            component_and_tz_mappings = self.mappings['components'] + self.mappings['trustzones']
+            self._all_labels = get_exact_labels(component_and_tz_mappings)
+        return self._all_labels
+
+    def get_mapped_labels(self):
+        if self._mapped_labels is None:
+            self._mapped_labels = MappedLabels(self.get_all_labels(), self.component_mappings.keys(),
+                                               pattern_matcher=self.get_label_pattern_matcher())
+        return self._mapped_labels
+
+    def get_component_patterns(self):
+        """
+        The (regex, mapping) pairs of the components mapped by a label pattern, in the order they are defined
+        """
+        return self.component_patterns
+
+    def get_component_pattern_matcher(self) -> LabelPatternMatcher:
+        """
+        Matcher of the label patterns that map components on their own, for the texts no exact label matches
+        """
+        if self._component_pattern_matcher is None:
+            self._component_pattern_matcher = build_component_pattern_matcher(self.component_patterns)
+        return self._component_pattern_matcher
+
+    def get_label_pattern_matcher(self) -> LabelPatternMatcher:
+        """
+        Matcher of all the label patterns, the counterpart of the exact labels of get_all_labels
+        """
+        if self._label_pattern_matcher is None:
+            self._label_pattern_matcher = build_label_pattern_matcher(self.component_patterns)
+        return self._label_pattern_matcher
+
+    def get_fingerprint(self) -> str:
+        """
+        Digest of everything the mapping of a diagram reads from these mappings, the same for mappings that
+        map alike however they were loaded, for the OTM cache to key on
+        """
+        if self._fingerprint is None:
+            default_trustzone = self.get_default_otm_trustzone()
+            document = json.dumps({
+                "components": dict(self.get_component_mappings()),
+                "trustzones": dict(self.get_trustzone_mappings()),
+                "component_patterns": self.get_component_patterns(),
+                "default_trustzone": [default_trustzone.id, default_trustzone.name, default_trustzone.type],
+            }, sort_keys=True)
+            self._fingerprint = hashlib.sha256(document.encode()).hexdigest()
+        return self._fingerprint
+
+    def get_trustzone_mappings(self):
+        return self.trustzone_mappings
+
+    def get_default_otm_trustzone(self):
+        return self.default_otm_trustzone
+
+    def get_component_mappings(self):
+        return self.component_mappings
+
+
+class MainMappingFileLoader(MappingLoader):
     def __init__(self, mapping_files):
-        self.component_mappings = None
-        self.trustzone_mappings = None 
-        self.default_otm_trustzone = None 
         mapping = MappingFileLoader(mapping_files).load()
-        self.mappings = self._load_mappings(mapping)
+        super().__init__(mappings=self._load_mappings(mapping))
 
     @staticmethod
     def _load_mappings(mapping_file):
+        import yaml
+        from deepmerge import always_merger
+
         if isinstance(mapping_file, dict):
             return mapping_file
         else:
@@ -142,43 +358,79 @@ class MainMappingFileLoader:
         self.default_otm_trustzone = self.__load_default_otm_trustzone()
         self.trustzone_mappings = self.__load_trustzone_mappings()
         self.component_mappings = self.__load_component_mappings()
-
-    def get_all_labels(self):
-        component_and_tz_mappings = self.mappings['components'] + self.mappings['trustzones']
-        return [c['label'] for c in component_and_tz_mappings]
+        self.component_patterns = build_component_patterns(search("components", self.mappings))
 
     def __load_default_otm_trustzone(self):
-        trustzone_mappings_list = jmespath.search("trustzones", self.mappings)
-        default_trustzones = [v for v in trustzone_mappings_list if 'default' in v and v['default']]
-        default_otm_trustzone = default_trustzones[-1] if len(default_trustzones) > 0 else None
-        if default_otm_trustzone:
-            name = default_otm_trustzone['label']
-            return Trustzone(trustzone_id=deterministic_uuid(name), name=name, type=default_otm_trustzone['type'],
-                             attributes={"default": True})
-        else:
-            return PUBLIC_CLOUD
+        return find_default_otm_trustzone(search("trustzones", self.mappings)) or PUBLIC_CLOUD
 
     def __load_trustzone_mappings(self):
-        trustzone_mappings_list = jmespath.search("trustzones", self.mappings)
-        return dict(zip([tz['label'] for tz in trustzone_mappings_list], trustzone_mappings_list))
+        return build_trustzone_mappings(search("trustzones", self.mappings))
 
     def __load_component_mappings(self):
-        component_mappings_list = jmespath.search("components", self.mappings)
-        return dict(zip([self.__get_component_identifier(cp) for cp in component_mappings_list],
-                        component_mappings_list))
+        return build_component_mappings(search("components", self.mappings))
 
-    def __get_component_identifier(self, component: dict) -> str:
-        identifier = component.get('id', component['label'])
-        return normalize_unique_id(identifier)
 
-    def get_trustzone_mappings(self):
-        return self.trustzone_mappings
 
-    def get_default_otm_trustzone(self):
-        return self.default_otm_trustzone
 
-    def get_component_mappings(self):
-        return self.component_mappings
+class LayeredMappingLoader(MappingLoader):
+    """
+    The mappings of override files stacked on loaded base mappings, which may be compiled or layered
+    themselves. It maps as the base and override files merged by MainMappingFileLoader would, but the
+    lookups go to the override first and then to the base, which is shared and never copied, so stacking
+    an override on a cached base costs the size of the override only.
+    """
+
+    def __init__(self, base: MappingLoader, override_files):
+        override = MappingFileLoader(override_files).load()
+        self.base = base
+        self.override_component_mappings = override.get('components') or []
+        self.override_trustzone_mappings = override.get('trustzones') or []
+
+        super().__init__(
+            component_mappings=_stack(build_component_mappings(self.override_component_mappings),
+                                      base.get_component_mappings()),
+            trustzone_mappings=_stack(build_trustzone_mappings(self.override_trustzone_mappings),
+                                      base.get_trustzone_mappings()),
+            default_otm_trustzone=find_default_otm_trustzone(self.override_trustzone_mappings) or
+            base.get_default_otm_trustzone(),
+            component_patterns=build_component_patterns(self.override_component_mappings)
+        )
+
+    def get_all_labels(self):
+        if self._all_labels is None:
+            override_labels = get_exact_labels(self.override_component_mappings + self.override_trustzone_mappings)
+            self._all_labels = self.base.get_all_labels() + override_labels
+        return self._all_labels
+
+    def get_mapped_labels(self):
+        if self._mapped_labels is None:
+            self._mapped_labels = MappedLabels(
+                get_exact_labels(self.override_component_mappings + self.override_trustzone_mappings),
+                build_component_mappings(self.override_component_mappings).keys(),
+                self.base.get_mapped_labels(),
+                build_label_pattern_matcher(self.component_patterns)
+            )
+        return self._mapped_labels
+
+    def get_component_patterns(self):
+        return self.base.get_component_patterns() + self.component_patterns
+
+    def get_component_pattern_matcher(self) -> LabelPatternMatcher:
+        if self._component_pattern_matcher is None:
+            self._component_pattern_matcher = build_component_pattern_matcher(
+                self.component_patterns, self.base.get_component_pattern_matcher())
+        return self._component_pattern_matcher
+
+    def get_label_pattern_matcher(self) -> LabelPatternMatcher:
+        if self._label_pattern_matcher is None:
+            self._label_pattern_matcher = build_label_pattern_matcher(
+                self.component_patterns, self.base.get_label_pattern_matcher())
+        return self._label_pattern_matcher
+
+
+def _stack(top: dict, base) -> ChainMap:
+    # the layers of a layered base are reused, not nested
+    return ChainMap(top, *base.maps) if isinstance(base, ChainMap) else ChainMap(top, base)
 
 
 
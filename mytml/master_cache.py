@@ -0,0 +1,101 @@
+import hashlib
+import threading
+import weakref
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+
+MASTER_CACHE_MAX_SIZE = 1024
+
+
+def _cell_float(shape, cell_name):
+    if shape is not None and cell_name in shape.cells:
+        return float(shape.cells[cell_name].value)
+
+
+class MasterAttributes:
+    def __init__(self, text="", shape_text="", width=None, height=None, begin_arrow=None, end_arrow=None):
+        self.text = text
+        self.shape_text = shape_text
+        self.width = width
+        self.height = height
+        self.begin_arrow = begin_arrow
+        self.end_arrow = end_arrow
+
+    @staticmethod
+    def from_master_shape(master_shape):
+        if master_shape is None:
+            return MasterAttributes()
+
+        text = master_shape.text or ""
+        shape_text = text or "".join(child.text for child in master_shape.child_shapes)
+
+        return MasterAttributes(
+            text=text,
+            shape_text=(shape_text or "").strip(),
+            width=_cell_float(master_shape, "Width"),
+            height=_cell_float(master_shape, "Height"),
+            begin_arrow=master_shape.cell_value("BeginArrow"),
+            end_arrow=master_shape.cell_value("EndArrow"),
+        )
+
+
+class MasterCache:
+    def __init__(self, max_size: int = MASTER_CACHE_MAX_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def resolve(self, key, builder):
+        with self.__lock:
+            if key in self.__entries:
+                self.hits += 1
+                self.__entries.move_to_end(key)
+                return self.__entries[key]
+            self.misses += 1
+
+        value = builder()
+
+        with self.__lock:
+            self.__entries[key] = value
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.max_size:
+                self.__entries.popitem(last=False)
+
+        return value
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        return {"size": len(self.__entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+
+MASTER_CACHE = MasterCache()
+
+# content digests are computed once per loaded master page and dropped with its document
+_master_page_digests = weakref.WeakKeyDictionary()
+
+
+def get_master_page_digest(master_page) -> str:
+    digest = _master_page_digests.get(master_page)
+    if digest is None:
+        digest = hashlib.sha1(ET.tostring(master_page.xml.getroot())).hexdigest()
+        _master_page_digests[master_page] = digest
+    return digest
+
+
+def get_master_attributes(shape) -> MasterAttributes:
+    master_page = shape.master_page
+    if not master_page:
+        return None
+
+    key = (master_page.master_unique_id, shape.master_shape_ID, get_master_page_digest(master_page))
+    return MASTER_CACHE.resolve(key, lambda: MasterAttributes.from_master_shape(shape.master_shape))
@@ -0,0 +1,28 @@
+import tracemalloc
+
+
+class PeakMemoryTracer:
+    """
+    Measures with tracemalloc the peak of Python memory allocated, in bytes, over what was already allocated
+    when the block was entered. Memory allocated by native libraries (GEOS for shapely) is not traced.
+    """
+
+    def __init__(self):
+        self.peak = None
+        self.__started = False
+        self.__baseline = 0
+
+    def __enter__(self):
+        self.__started = not tracemalloc.is_tracing()
+        if self.__started:
+            tracemalloc.start()
+        else:
+            tracemalloc.reset_peak()
+        self.__baseline = tracemalloc.get_traced_memory()[0]
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.peak = tracemalloc.get_traced_memory()[1] - self.__baseline
+        if self.__started:
+            tracemalloc.stop()
+        return False
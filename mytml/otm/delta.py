@@ -0,0 +1,118 @@
+import json
+from mytml.otm.otm import OTM
+from mytml.otm.serialization import deserialize_otm
+
+
+def _to_document(otm) -> dict:
+    if isinstance(otm, OTM):
+        return otm.json()
+    if isinstance(otm, (str, bytes)):
+        return json.loads(otm)
+    return otm
+
+
+def _is_keyed_collection(value) -> bool:
+    return isinstance(value, list) and all(isinstance(element, dict) and 'id' in element for element in value)
+
+
+def _index_by_id(elements: list):
+    elements_by_id = {element['id']: element for element in elements}
+    # an id found twice cannot key the changes
+    return elements_by_id if len(elements_by_id) == len(elements) else None
+
+
+def _collection_delta(name: str, previous: list, new: list) -> list:
+    previous_by_id, new_by_id = _index_by_id(previous), _index_by_id(new)
+    if previous_by_id is None or new_by_id is None:
+        return [{"op": "replace", "path": f"/{name}", "value": new}]
+
+    changes = []
+    for element_id in previous_by_id:
+        if element_id not in new_by_id:
+            changes.append({"op": "remove", "collection": name, "id": element_id})
+
+    added_ids = []
+    for element_id, element in new_by_id.items():
+        previous_element = previous_by_id.get(element_id)
+        if previous_element is None:
+            added_ids.append(element_id)
+            changes.append({"op": "add", "collection": name, "id": element_id, "value": element})
+        elif previous_element != element:
+            changes.append({"op": "replace", "collection": name, "id": element_id, "value": element})
+
+    # the elements are applied in place and added at the end, any other order has to be given
+    applied_order = [element_id for element_id in previous_by_id if element_id in new_by_id] + added_ids
+    new_order = list(new_by_id)
+    if applied_order != new_order:
+        changes.append({"op": "order", "collection": name, "ids": new_order})
+
+    return changes
+
+
+def calculate_otm_delta(new_otm, previous_otm) -> list:
+    """
+    Changes that turn the previous OTM into the new one, element by element and keyed by element id:
+    {"op": "add" | "replace", "collection": ..., "id": ..., "value": ...}, {"op": "remove", "collection": ...,
+    "id": ...}, {"op": "order", "collection": ..., "ids": [...]} and, for the other members of the model,
+    {"op": "add" | "replace", "path": "/<member>", "value": ...} and {"op": "remove", "path": "/<member>"}.
+    Both OTMs may be given as OTM objects, as JSON or as already loaded JSON documents.
+    """
+    previous, new = _to_document(previous_otm), _to_document(new_otm)
+
+    changes = []
+    for name in previous:
+        if name not in new:
+            changes.append({"op": "remove", "path": f"/{name}"})
+
+    for name, value in new.items():
+        if name not in previous:
+            changes.append({"op": "add", "path": f"/{name}", "value": value})
+        elif _is_keyed_collection(previous[name]) and _is_keyed_collection(value):
+            changes.extend(_collection_delta(name, previous[name], value))
+        elif previous[name] != value:
+            changes.append({"op": "replace", "path": f"/{name}", "value": value})
+
+    return changes
+
+
+def apply_otm_delta_to_document(previous_document: dict, changes: list) -> dict:
+    document = dict(previous_document)
+    collections = {}
+
+    def get_collection(name: str) -> dict:
+        if name not in collections:
+            collections[name] = {element['id']: element for element in document.get(name, [])}
+        return collections[name]
+
+    for change in changes:
+        op = change['op']
+        if 'path' in change:
+            name = change['path'].lstrip('/')
+            collections.pop(name, None)
+            if op == 'remove':
+                document.pop(name, None)
+            else:
+                document[name] = change['value']
+            continue
+
+        collection = get_collection(change['collection'])
+        if op == 'remove':
+            del collection[change['id']]
+        elif op in ('add', 'replace'):
+            collection[change['id']] = change['value']
+        elif op == 'order':
+            collections[change['collection']] = {element_id: collection[element_id] for element_id in change['ids']}
+        else:
+            raise Exception(f'Unknown OTM delta operation {op}')
+
+    # the members keep their order in the document
+    for name, collection in collections.items():
+        document[name] = list(collection.values())
+    return document
+
+
+def apply_otm_delta(previous_otm, changes: list) -> OTM:
+    """
+    The OTM calculate_otm_delta was given, from the previous OTM and the changes it returned
+    """
+    return deserialize_otm(apply_otm_delta_to_document(_to_document(previous_otm), changes))
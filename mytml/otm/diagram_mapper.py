@@ -1,6 +1,6 @@
 
 from mytml.utils import normalize_label , deterministic_uuid
-from mytml.diagram import Component, Dataflow, Trustzone
+from mytml.diagram import Component, Dataflow, Trustzone, is_label_mapped
 from enum import Enum 
 
 
@@ -28,16 +28,19 @@ class DiagramComponentMapper:
                  component_mappings: dict,
                  trustzone_mappings: dict,
                  default_trustzone,
-                 representation_calculator):
+                 representation_calculator,
+                 pattern_matcher=None):
         self.components = components
         self.normalized_component_mappings = {normalize_label(lb): value for (lb, value) in component_mappings.items()}
         self.trustzone_mappings = trustzone_mappings
         self.default_trustzone = default_trustzone
+        # LabelPatternMatcher of the mappings by label pattern, tried when no exact label matches
+        self.pattern_matcher = pattern_matcher
 
         self.representation_calculator = representation_calculator
 
-    def _calculate_parent_type(self, component):
-        if not component.parent or component.parent.name in self._get_trustzone_mappings().keys():
+    def _calculate_parent_type(self, parent):
+        if not parent or parent.name in self._get_trustzone_mappings().keys():
             return ParentType.TRUST_ZONE
         else:
             return ParentType.COMPONENT
@@ -46,19 +49,24 @@ class DiagramComponentMapper:
         return self.__map_to_otm(self.__filter_components())
 
     def __filter_components(self):
-        return [component for component in self.components if self.__filter_component(component)]
+        return [component for component in self.components if self.is_mapped(component)]
 
-    def __filter_component(self, component):
+    def is_mapped(self, component):
         map_by_name = normalize_label(component.name) in self.normalized_component_mappings
         map_by_type = normalize_label(component.type) in self.normalized_component_mappings
         map_by_unique_id = component.unique_id in self.normalized_component_mappings
-        return map_by_name or map_by_type or map_by_unique_id
+        return map_by_name or map_by_type or map_by_unique_id or \
+            self.__find_mapped_component_by_pattern(component.unique_id, component.name, component.type) is not None
 
     def __map_to_otm(self, component_candidates):
-        return list(map(self.__build_otm_component, component_candidates))
+        return list(map(self.build_otm_component, component_candidates))
+
+    def build_otm_component(self, diagram_component):
+        return self.build_otm_component_in(diagram_component, diagram_component.parent)
 
-    def __build_otm_component(self, diagram_component):
-        representation = self.representation_calculator.calculate_representation(diagram_component)
+    def build_otm_component_in(self, diagram_component, parent):
+        representation = self.representation_calculator.calculate_representation_as(
+            diagram_component, parent, diagram_component.trustzone)
 
         return Component(
             component_id=diagram_component.id,
@@ -66,8 +74,8 @@ class DiagramComponentMapper:
             component_type=self.__calculate_otm_type(diagram_component.name,
                                                      diagram_component.type,
                                                      diagram_component.unique_id),
-            parent=self.__calculate_parent_id(diagram_component),
-            parent_type=self._calculate_parent_type(diagram_component),
+            parent=self.__calculate_parent_id(parent),
+            parent_type=self._calculate_parent_type(parent),
             representations=[representation] if representation else None
         )
 
@@ -80,15 +88,31 @@ class DiagramComponentMapper:
         if not otm_type:
             otm_type = self.__find_mapped_component_by_label(component_type)
 
+        # exact labels have priority over patterns
+        if not otm_type:
+            mapping = self.__find_mapped_component_by_pattern(component_unique_id, component_name, component_type)
+            otm_type = mapping['type'] if mapping else None
+
         return otm_type or 'empty-component'
 
+    def __find_mapped_component_by_pattern(self, *labels):
+        if self.pattern_matcher is None:
+            return None
+
+        for label in labels:
+            mapping = self.pattern_matcher.match(normalize_label(label))
+            if mapping:
+                return mapping
+        return None
+
     def __find_mapped_component_by_label(self, label: str) -> str:
-        return self.normalized_component_mappings[normalize_label(label)]['type'] \
-            if normalize_label(label) in self.normalized_component_mappings else None
+        normalized_label = normalize_label(label)
+        return self.normalized_component_mappings[normalized_label]['type'] \
+            if normalized_label in self.normalized_component_mappings else None
 
-    def __calculate_parent_id(self, component) -> str:
-        if component.parent:
-            return component.parent.id
+    def __calculate_parent_id(self, parent) -> str:
+        if parent:
+            return parent.id
 
         if self.default_trustzone:
             return self.default_trustzone.id
@@ -138,26 +162,32 @@ class DiagramTrustzoneMapper:
         trustzones = []
 
         for c in self.components:
-            if c.name in self.trustzone_mappings:
+            if self.is_trustzone(c):
                 c.trustzone = True
                 trustzones.append(c)
 
         return trustzones
 
+    def is_trustzone(self, component):
+        return component.name in self.trustzone_mappings
+
     def __map_to_otm(self, trustzones):
-        return list(map(self.__build_otm_trustzone, trustzones)) \
+        return list(map(self.build_otm_trustzone, trustzones)) \
             if trustzones \
             else []
 
-    def __build_otm_trustzone(self, trustzone):
+    def build_otm_trustzone(self, trustzone):
+        return self.build_otm_trustzone_in(trustzone, trustzone.parent)
+
+    def build_otm_trustzone_in(self, trustzone, parent):
         trustzone_mapping = self.trustzone_mappings[trustzone.name]
 
-        representation = self.representation_calculator.calculate_representation(trustzone)
+        representation = self.representation_calculator.calculate_representation_as(trustzone, parent, True)
         return Trustzone(
             trustzone_id=trustzone.id,
             name=trustzone.name if trustzone.name else trustzone_mapping['type'],
-            parent=self.__calculate_parent_id(trustzone),
-            parent_type=self._calculate_parent_type(trustzone),
+            parent=self.__calculate_parent_id(parent),
+            parent_type=self._calculate_parent_type(parent),
             type=self.find_type(trustzone_mapping),
             representations=[representation] if representation else None
         )
@@ -169,15 +199,79 @@ class DiagramTrustzoneMapper:
         return trustzone_mapping['type']
 
 
-    def __calculate_parent_id(self, component):
-        if component.parent:
-            return component.parent.id
+    def __calculate_parent_id(self, parent):
+        if parent:
+            return parent.id
 
-    def _calculate_parent_type(self, component):
-        if not component.parent or component.parent.name in self._get_trustzone_mappings().keys():
+    def _calculate_parent_type(self, parent):
+        if not parent or parent.name in self._get_trustzone_mappings().keys():
             return ParentType.TRUST_ZONE
         else:
             return ParentType.COMPONENT
 
     def _get_trustzone_mappings(self):
         return self.trustzone_mappings
+
+
+class DiagramMapper:
+    """
+    Maps a parsed diagram in one pass over its components and another over its connectors, leaving the
+    diagram unchanged. Each component is classified once: pruned, as DiagramPruner would prune it, or mapped
+    as trust zone, component or both. A component whose parent is pruned is placed where DiagramPruner
+    would move it. Only the dataflows between mapped components are built, as OTMPruner would leave them.
+    """
+
+    def __init__(self, diagram, mapped_labels: [str], label_pattern_matcher, component_mapper, trustzone_mapper):
+        self.diagram = diagram
+        self.normalized_mapped_labels = {normalize_label(mapped_label) for mapped_label in mapped_labels}
+        self.label_pattern_matcher = label_pattern_matcher
+        self.component_mapper = component_mapper
+        self.trustzone_mapper = trustzone_mapper
+        # whether each component is kept, by object id, as parents are looked up once per child
+        self.__kept = {}
+
+        self.trustzones = []
+        self.components = []
+        self.dataflows = []
+        self.default_trustzone_used = False
+
+    def run(self):
+        default_trustzone = self.component_mapper.default_trustzone
+        component_ids = set()
+
+        for diagram_component in self.diagram.components:
+            if not self.__is_kept(diagram_component):
+                continue
+            parent = self.__find_parent(diagram_component)
+
+            if self.component_mapper.is_mapped(diagram_component):
+                component = self.component_mapper.build_otm_component_in(diagram_component, parent)
+                self.components.append(component)
+                component_ids.add(component.id)
+                if default_trustzone and component.parent == default_trustzone.id:
+                    self.default_trustzone_used = True
+
+            if self.trustzone_mapper.is_trustzone(diagram_component):
+                self.trustzones.append(self.trustzone_mapper.build_otm_trustzone_in(diagram_component, parent))
+
+        for connector in self.diagram.connectors:
+            if connector.from_id in component_ids and connector.to_id in component_ids:
+                self.dataflows.append(DiagramConnectorMapper.build_otm_dataflow(connector))
+
+        return self
+
+    def __is_kept(self, diagram_component) -> bool:
+        kept = self.__kept.get(id(diagram_component))
+        if kept is None:
+            kept = is_label_mapped(diagram_component, self.normalized_mapped_labels, self.label_pattern_matcher)
+            self.__kept[id(diagram_component)] = kept
+        return kept
+
+    def __find_parent(self, diagram_component):
+        # a pruned parent hands over its own parent, if that one is kept
+        parent = diagram_component.parent
+        if parent is None or self.__is_kept(parent):
+            return parent
+
+        grandparent = parent.parent
+        return grandparent if grandparent is not None and self.__is_kept(grandparent) else None
@@ -1,26 +1,110 @@
-from mytml.utils import remove_duplicates
 from mytml.diagram import Trustzone, Component, Dataflow
 from mytml.otm.representation import Representation, RepresentationType, DiagramRepresentation
+from mytml.otm.otm_index import OTMIndex
 
 REPRESENTATIONS_SIZE_DEFAULT_HEIGHT = 1000
 REPRESENTATIONS_SIZE_DEFAULT_WIDTH = 1000
+OTM_VERSION = "0.1.0"
 
 
 class OTM:
     def __init__(self, project_name, project_id, provider):
         self.project_name = project_name
         self.project_id = project_id
+        self.__index = None
         self.representations = []
         self.trustzones = []
         self.components = []
         self.dataflows = []
         self.threats = []
         self.mitigations = []
-        self.version = "0.1.0"
+        self.version = OTM_VERSION
         self.__provider = provider
 
         self.add_default_representation()
 
+    # assigning the element lists, as the builder and the pruners do, drops the indexes, which are built
+    # again on the next lookup
+    @property
+    def trustzones(self):
+        return self.__trustzones
+
+    @trustzones.setter
+    def trustzones(self, trustzones):
+        self.__trustzones = trustzones
+        self.__index = None
+
+    @property
+    def components(self):
+        return self.__components
+
+    @components.setter
+    def components(self, components):
+        self.__components = components
+        self.__index = None
+
+    @property
+    def dataflows(self):
+        return self.__dataflows
+
+    @dataflows.setter
+    def dataflows(self, dataflows):
+        self.__dataflows = dataflows
+        self.__index = None
+
+    @property
+    def index(self) -> OTMIndex:
+        if self.__index is None:
+            self.__index = OTMIndex(self.trustzones, self.components, self.dataflows)
+        return self.__index
+
+    def reindex(self):
+        """
+        To be called after changing in place the id or parent of an element, or the nodes of a dataflow
+        """
+        self.__index = None
+
+    def get_trustzone(self, trustzone_id):
+        return self.index.trustzones.get(trustzone_id)
+
+    def get_component(self, component_id):
+        return self.index.components.get(component_id)
+
+    def get_dataflow(self, dataflow_id):
+        return self.index.dataflows.get(dataflow_id)
+
+    def get_element(self, element_id):
+        return self.get_component(element_id) or self.get_trustzone(element_id)
+
+    def get_children(self, parent_id) -> list:
+        return list(self.index.children.get(parent_id, []))
+
+    def get_trustzone_components(self, trustzone_id) -> list:
+        """
+        The components inside the trust zone, directly or through other components or trust zones
+        """
+        return self.index.get_descendant_components(trustzone_id)
+
+    def get_outbound_dataflows(self, node_id) -> list:
+        return list(self.index.outbound.get(node_id, []))
+
+    def get_inbound_dataflows(self, node_id) -> list:
+        return list(self.index.inbound.get(node_id, []))
+
+    def get_reachable_components(self, element_id) -> list:
+        """
+        The components a dataflow path leads to from the component, or from any component of the trust zone,
+        with the given id. Bidirectional dataflows are followed both ways.
+        """
+        index = self.index
+        if element_id in index.trustzones:
+            sources = [component.id for component in index.get_descendant_components(element_id)]
+        else:
+            sources = [element_id]
+
+        reachable_ids = index.get_reachable_ids(sources)
+        return [component for component in self.components if component.id in reachable_ids]
+
     def objects_by_type(self, type):
         if type == "trustzone":
             return self.trustzones
@@ -62,19 +146,28 @@ class OTM:
         return json
 
     def add_trustzone(self, id=None, name=None, type=None, source=None, properties=None):
-        self.trustzones.append(Trustzone(trustzone_id=id, name=name, type=type, source=source, attributes=properties))
+        trustzone = Trustzone(trustzone_id=id, name=name, type=type, source=source, attributes=properties)
+        self.trustzones.append(trustzone)
+        if self.__index is not None:
+            self.__index.trustzones.setdefault(trustzone.id, trustzone)
 
     def add_component(self, id, name, type, parent, parent_type, source=None,
                       attributes=None, tags=None):
-        self.components.append(
-            Component(component_id=id, name=name, component_type=type, parent=parent, parent_type=parent_type,
-                         source=source, attributes=attributes, tags=tags))
+        component = Component(component_id=id, name=name, component_type=type, parent=parent,
+                              parent_type=parent_type, source=source, attributes=attributes, tags=tags)
+        self.components.append(component)
+        if self.__index is not None:
+            self.__index.components.setdefault(component.id, component)
+            self.__index.add_child(component)
 
     def add_dataflow(self, id, name, source_node, destination_node, bidirectional=None,
                      source=None, attributes=None, tags=None):
-        self.dataflows.append(Dataflow(dataflow_id=id, name=name, bidirectional=bidirectional, source_node=source_node,
-                                          destination_node=destination_node, source=source, attributes=attributes,
-                                          tags=tags))
+        dataflow = Dataflow(dataflow_id=id, name=name, bidirectional=bidirectional, source_node=source_node,
+                            destination_node=destination_node, source=source, attributes=attributes, tags=tags)
+        self.dataflows.append(dataflow)
+        if self.__index is not None:
+            self.__index.dataflows.setdefault(dataflow.id, dataflow)
+            self.__index.add_dataflow(dataflow)
 
     def add_representation(self, id_=None, name=None, type_=None):
         self.representations.append(Representation(id_=id_, name=name, type_=type_))
@@ -113,7 +206,15 @@ class OTMBuilder:
         return self
 
     def add_trustzones(self, trustzones):
-        self.otm.trustzones = remove_duplicates(self.otm.trustzones + trustzones)
+        # trust zones are equal when their ids are, the first one of each id is kept
+        unique_trustzones = list(self.otm.trustzones)
+        trustzone_ids = {trustzone.id for trustzone in unique_trustzones}
+        for trustzone in trustzones:
+            if trustzone.id not in trustzone_ids:
+                trustzone_ids.add(trustzone.id)
+                unique_trustzones.append(trustzone)
+
+        self.otm.trustzones = unique_trustzones
         return self
 
     def add_components(self, components):
@@ -149,7 +250,7 @@ class OTMPruner:
 
     def __init__(self, otm):
         self.otm = otm
-        self.otm_component_ids = [c.id for c in self.otm.components]
+        self.otm_component_ids = self.otm.index.components.keys()
 
     def prune_orphan_dataflows(self):
         dataflows = []
@@ -220,12 +321,11 @@ class OTMTrustZoneUnifier:
             self.change_childs(old_id, valid_id)
             tz.id = valid_id
 
+        self.otm.reindex()
         self.delete_duplicated_tz()
 
     def change_childs(self, old_id, valid_id):
-        for child in self.otm.components + self.otm.trustzones:
-            if child.parent == old_id:
-                child.parent = valid_id
+        self.otm.index.move_children(old_id, valid_id)
 
     def delete_duplicated_tz(self):
         deduplicated = dict()
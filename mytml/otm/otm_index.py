@@ -0,0 +1,70 @@
+from collections import deque
+
+
+class OTMIndex:
+    """
+    Lookup tables of an OTM: its trust zones, components and dataflows by id, the trust zones and
+    components by parent id, and the dataflows by source and destination node
+    """
+
+    def __init__(self, trustzones: list, components: list, dataflows: list):
+        self.trustzones = {}
+        self.components = {}
+        self.dataflows = {}
+        self.children = {}
+        self.outbound = {}
+        self.inbound = {}
+
+        for trustzone in trustzones:
+            self.trustzones.setdefault(trustzone.id, trustzone)
+        for component in components:
+            self.components.setdefault(component.id, component)
+        for dataflow in dataflows:
+            self.dataflows.setdefault(dataflow.id, dataflow)
+            self.add_dataflow(dataflow)
+        for element in components + trustzones:
+            self.add_child(element)
+
+    def add_child(self, element):
+        if element.parent is not None:
+            self.children.setdefault(element.parent, []).append(element)
+
+    def add_dataflow(self, dataflow):
+        self.outbound.setdefault(dataflow.source_node, []).append(dataflow)
+        self.inbound.setdefault(dataflow.destination_node, []).append(dataflow)
+
+    def move_children(self, old_parent_id, new_parent_id):
+        children = self.children.pop(old_parent_id, [])
+        for child in children:
+            child.parent = new_parent_id
+        if children:
+            self.children.setdefault(new_parent_id, []).extend(children)
+
+    def get_descendant_components(self, parent_id) -> list:
+        descendants, pending, visited = [], deque([parent_id]), {parent_id}
+        while pending:
+            for child in self.children.get(pending.popleft(), []):
+                if child.id in visited:
+                    continue
+                visited.add(child.id)
+                pending.append(child.id)
+                if self.components.get(child.id) is child:
+                    descendants.append(child)
+        return descendants
+
+    def get_neighbours(self, node_id):
+        for dataflow in self.outbound.get(node_id, []):
+            yield dataflow.destination_node
+        for dataflow in self.inbound.get(node_id, []):
+            if dataflow.bidirectional:
+                yield dataflow.source_node
+
+    def get_reachable_ids(self, node_ids) -> set:
+        # breadth first along the dataflows, both ways along the bidirectional ones
+        reachable, pending = set(), deque(node_ids)
+        while pending:
+            for neighbour in self.get_neighbours(pending.popleft()):
+                if neighbour not in reachable:
+                    reachable.add(neighbour)
+                    pending.append(neighbour)
+        return reachable
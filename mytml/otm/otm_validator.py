@@ -0,0 +1,121 @@
+import json
+import threading
+from importlib import resources
+
+OTM_SCHEMA_FILENAME = 'otm_schema.json'
+
+# the schema validator is compiled on first use and then shared by every validation of the process
+_schema_validator = None
+_schema_validator_lock = threading.Lock()
+
+
+def get_otm_schema_validator():
+    global _schema_validator
+
+    if _schema_validator is None:
+        with _schema_validator_lock:
+            if _schema_validator is None:
+                from jsonschema.validators import validator_for
+
+                schema = json.loads((resources.files('mytml') / 'data' / OTM_SCHEMA_FILENAME).read_text())
+                validator_class = validator_for(schema)
+                validator_class.check_schema(schema)
+                _schema_validator = validator_class(schema)
+    return _schema_validator
+
+
+class OTMValidationError(Exception):
+    """
+    Raised when an OTM does not follow the Open Threat Model schema or refers to elements it does not have.
+    errors holds every problem found.
+    """
+
+    def __init__(self, errors: list):
+        self.errors = errors
+        super().__init__('Invalid OTM: ' + '; '.join(errors))
+
+
+def get_schema_errors(document: dict) -> list:
+    errors = []
+    for error in get_otm_schema_validator().iter_errors(document):
+        path = '/'.join(str(part) for part in error.absolute_path)
+        errors.append(f'/{path}: {error.message}')
+    return errors
+
+
+def get_structure_errors(document: dict) -> list:
+    """
+    The element ids found twice and the parents, dataflow nodes and element representations that do not
+    resolve, collected in a single walk of the elements and checked against their ids afterwards
+    """
+    errors = []
+    representation_ids, trustzone_ids, component_ids, element_ids, element_representation_ids = \
+        set(), set(), set(), set(), set()
+    # (referring element, reference kind, referred id)
+    references = []
+
+    def add_id(ids: set, element_id, kind: str):
+        if element_id in ids:
+            errors.append(f'Duplicated {kind} id {element_id}')
+        ids.add(element_id)
+
+    def walk_representation_elements(element: dict):
+        for representation_element in element.get('representations') or []:
+            add_id(element_representation_ids, representation_element.get('id'), 'representation element')
+            if 'representation' in representation_element:
+                references.append((element.get('id'), 'representation', representation_element['representation']))
+
+    def walk_parent(element: dict):
+        for parent_type, parent_id in (element.get('parent') or {}).items():
+            references.append((element.get('id'), parent_type, parent_id))
+
+    for representation in document.get('representations') or []:
+        add_id(representation_ids, representation.get('id'), 'representation')
+
+    for trustzone in document.get('trustZones') or []:
+        add_id(element_ids, trustzone.get('id'), 'element')
+        trustzone_ids.add(trustzone.get('id'))
+        walk_parent(trustzone)
+        walk_representation_elements(trustzone)
+
+    for component in document.get('components') or []:
+        add_id(element_ids, component.get('id'), 'element')
+        component_ids.add(component.get('id'))
+        walk_parent(component)
+        walk_representation_elements(component)
+
+    for dataflow in document.get('dataflows') or []:
+        add_id(element_ids, dataflow.get('id'), 'element')
+        references.append((dataflow.get('id'), 'source', dataflow.get('source')))
+        references.append((dataflow.get('id'), 'destination', dataflow.get('destination')))
+
+    nodes = trustzone_ids | component_ids
+    referred_ids = {
+        'trustZone': trustzone_ids,
+        'component': component_ids,
+        'source': nodes,
+        'destination': nodes,
+        'representation': representation_ids
+    }
+    for element_id, kind, referred_id in references:
+        if referred_id not in referred_ids.get(kind, ()):
+            errors.append(f'The {kind} {referred_id} of {element_id} does not exist')
+
+    return errors
+
+
+class OTMValidator:
+    """
+    Checks an OTM, or its JSON document, against the Open Threat Model schema shipped with the package and
+    checks that its ids are unique and its references resolve
+    """
+
+    def __init__(self, otm):
+        self.document = otm if isinstance(otm, dict) else otm.json()
+        self.errors = []
+
+    def validate(self):
+        self.errors = get_schema_errors(self.document) + get_structure_errors(self.document)
+        if self.errors:
+            raise OTMValidationError(self.errors)
+        return self
@@ -11,18 +11,27 @@ def scale_to_int(value: float) -> int:
 
 
 def get_absolute_coordinates(component):
-    minx, miny, maxx, maxy = component.representation.bounds
+    return get_bounds_coordinates(component.representation.bounds)
+
+
+def get_bounds_coordinates(bounds) -> tuple:
+    minx, miny, maxx, maxy = bounds
     return scale_to_int(minx), scale_to_int(maxy)
 
 
 def has_representation(component: DiagramComponent) -> bool:
+    return has_representation_as(component, component.parent, component.trustzone)
+
+
+def has_representation_as(component: DiagramComponent, parent, trustzone: bool) -> bool:
+    # the component placed in the given parent and mapped as trust zone or not, whatever its own attributes say
     if not component.representation or component.origin == DiagramComponentOrigin.BOUNDARY:
         return False
 
-    if not component.trustzone and (not component.parent or not component.parent.representation):
+    if not trustzone and (not parent or not parent.representation):
         return False
 
-    if component.parent and component.parent.origin == DiagramComponentOrigin.BOUNDARY:
+    if parent and parent.origin == DiagramComponentOrigin.BOUNDARY:
         return False
 
     return True
@@ -38,7 +47,11 @@ def calculate_diagram_size(diagram_limits: DiagramLimits):
 
 
 def calculate_size(component: DiagramComponent):
-    minx, miny, maxx, maxy = component.representation.bounds
+    return calculate_bounds_size(component.representation.bounds)
+
+
+def calculate_bounds_size(bounds) -> tuple:
+    minx, miny, maxx, maxy = bounds
     return scale_to_int(maxx) - scale_to_int(minx), scale_to_int(maxy) - scale_to_int(miny)
 
 
@@ -49,32 +62,46 @@ class RepresentationCalculator:
         self.limits = limits
 
     def calculate_representation(self, component: DiagramComponent):
-        if not has_representation(component):
+        return self.calculate_representation_as(component, component.parent, component.trustzone)
+
+    def calculate_representation_as(self, component: DiagramComponent, parent, trustzone: bool):
+        if not has_representation_as(component, parent, trustzone):
             return None
 
+        # shapely calculates the bounds again on every access
+        bounds = component.representation.bounds
         return RepresentationElement(
             id_=f'{component.id}-representation',
             name=f'{component.name} Representation',
             representation=self.diagram_representation_id,
-            position=self.__build_position(component),
-            size=build_size_object(calculate_size(component))
+            position=self.__build_position(bounds, parent),
+            size=build_size_object(calculate_bounds_size(bounds))
         )
 
-    def __build_position(self, component: DiagramComponent):
-        xleft, ytop = self.__calculate_position(component)
+    def __build_position(self, bounds, parent):
+        xleft, ytop = self.__calculate_position(bounds, parent)
 
         return {'x': xleft, 'y': ytop}
 
-    def __calculate_position(self, component: DiagramComponent):
-        xleft, ytop = get_absolute_coordinates(component)
-        xmin, ymax = self.__get_parent_coordinates(component)
+    def __calculate_position(self, bounds, parent):
+        xleft, ytop = get_bounds_coordinates(bounds)
+        xmin, ymax = self.__get_parent_coordinates(parent)
 
         return xleft - xmin, ymax - ytop
 
-    def __get_parent_coordinates(self, component):
-        return get_absolute_coordinates(component.parent) \
-            if component.parent \
+    def __get_parent_coordinates(self, parent):
+        return get_absolute_coordinates(parent) \
+            if parent \
             else self.__get_diagram_origin()
 
     def __get_diagram_origin(self):
         return scale_to_int(self.limits.x_floor), scale_to_int(self.limits.y_top)
+
+
+class NoRepresentationCalculator:
+
+    def calculate_representation(self, component: DiagramComponent):
+        return None
+
+    def calculate_representation_as(self, component: DiagramComponent, parent, trustzone: bool):
+        return None
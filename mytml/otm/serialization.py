@@ -0,0 +1,81 @@
+import json
+from mytml.diagram import Trustzone, Component, Dataflow, DiagramType
+from mytml.otm.diagram_mapper import ParentType
+from mytml.otm.otm import OTM, OTMBuilder
+from mytml.otm.representation import Representation, DiagramRepresentation, RepresentationElement, \
+    RepresentationType
+
+
+def serialize_otm(otm: OTM) -> str:
+    # elements keep the order in which the conversion produced them, so equal models serialize to equal bytes
+    return json.dumps(otm.json(), ensure_ascii=False, separators=(',', ':'))
+
+
+def deserialize_otm(data) -> OTM:
+    document = json.loads(data) if isinstance(data, (str, bytes)) else data
+    return OTMJsonLoader(document).load()
+
+
+def _parse_parent(element: dict):
+    if 'parent' not in element:
+        return None, None
+    parent_type, parent = next(iter(element['parent'].items()))
+    return parent, ParentType(parent_type)
+
+
+def _parse_representation(representation: dict) -> Representation:
+    if 'size' in representation:
+        return DiagramRepresentation(id_=representation['id'], name=representation['name'],
+                                     type_=RepresentationType(representation['type']),
+                                     description=representation.get('description'),
+                                     attributes=representation.get('attributes'), size=representation['size'])
+    return Representation(id_=representation['id'], name=representation['name'],
+                          type_=RepresentationType(representation['type']),
+                          description=representation.get('description'), attributes=representation.get('attributes'))
+
+
+def _parse_representation_elements(element: dict):
+    if 'representations' not in element:
+        return None
+    return [RepresentationElement(id_=r['id'], name=r['name'], representation=r.get('representation'),
+                                  position=r.get('position'), size=r.get('size'), attributes=r.get('attributes'))
+            for r in element['representations']]
+
+
+class OTMJsonLoader:
+
+    def __init__(self, document: dict, provider=DiagramType.VISIO):
+        self.document = document
+        self.provider = provider
+
+    def load(self) -> OTM:
+        project = self.document['project']
+        return OTMBuilder(project['id'], project['name'], self.provider) \
+            .add_representations(list(map(_parse_representation, self.document.get('representations', []))),
+                                 extend=False) \
+            .add_trustzones(list(map(self.__parse_trustzone, self.document.get('trustZones', [])))) \
+            .add_components(list(map(self.__parse_component, self.document.get('components', [])))) \
+            .add_dataflows(list(map(self.__parse_dataflow, self.document.get('dataflows', [])))) \
+            .build()
+
+    @staticmethod
+    def __parse_trustzone(element: dict) -> Trustzone:
+        parent, parent_type = _parse_parent(element)
+        trustzone = Trustzone(trustzone_id=element['id'], name=element['name'], parent=parent,
+                              parent_type=parent_type, type=element['id'], attributes=element.get('attributes'),
+                              representations=_parse_representation_elements(element))
+        trustzone.trustrating = element.get('risk', {}).get('trustRating', trustzone.trustrating)
+        return trustzone
+
+    @staticmethod
+    def __parse_component(element: dict) -> Component:
+        parent, parent_type = _parse_parent(element)
+        return Component(component_id=element['id'], name=element['name'], component_type=element['type'],
+                         parent=parent, parent_type=parent_type, attributes=element.get('attributes'),
+                         tags=element.get('tags'), representations=_parse_representation_elements(element))
+
+    @staticmethod
+    def __parse_dataflow(element: dict) -> Dataflow:
+        return Dataflow(dataflow_id=element['id'], name=element['name'], source_node=element['source'],
+                        destination_node=element['destination'], bidirectional=element.get('bidirectional'),
+                        attributes=element.get('attributes'), tags=element.get('tags'))
@@ -62,12 +62,16 @@ def is_contained(
 
 
 class ParentCalculator:
-    def __init__(self, component: DiagramComponent):
+    def __init__(self, component: DiagramComponent, budget=None):
         self.child_candidate = component
+        self.budget = budget
 
     def calculate_parent(
         self, parent_candidates: List[DiagramComponent]
     ) -> DiagramComponent:
+        if self.budget:
+            self.budget.count_containment_tests(len(parent_candidates))
+
         potential_parents = []
         for parent_candidate in parent_candidates:
             if is_contained(parent_candidate, self.child_candidate):
@@ -78,3 +82,30 @@ class ParentCalculator:
 
         if len(potential_parents) > 1:
             return select_parent_by_area(potential_parents)
+
+
+def calculate_parents(components: List[DiagramComponent], budget=None) -> list:
+    """
+    The parents ParentCalculator infers for the components, None for the ones without parent. Only the
+    components that contain a child, found through a spatial index of them all, are tested as its parents,
+    in page order. The budget counts the containment tests of testing every component, as the parallel
+    inference by tiles does.
+    """
+    from shapely import STRtree
+
+    representations = [component.representation for component in components]
+    if any(representation is None for representation in representations):
+        # the inference fails on them as before
+        return [ParentCalculator(component, budget).calculate_parent(components) for component in components]
+
+    candidates = [[] for _ in components]
+    for child_index, candidate_index in zip(*STRtree(representations).query(representations, predicate='within')):
+        candidates[child_index].append(candidate_index)
+
+    parents = []
+    for component, candidate_indexes in zip(components, candidates):
+        if budget:
+            budget.count_containment_tests(len(components))
+        parents.append(ParentCalculator(component).calculate_parent(
+            [components[i] for i in sorted(candidate_indexes)]))
+    return parents
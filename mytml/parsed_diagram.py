@@ -0,0 +1,95 @@
+import hashlib
+import marshal
+import struct
+from mytml import __version__
+from mytml.diagram import Diagram, DiagramComponent, DiagramComponentOrigin, DiagramConnector, DiagramLimits
+
+PARSED_DIAGRAM_MAGIC = b'MYTMLDGM'
+PARSED_DIAGRAM_FORMAT_VERSION = 1
+PARSED_DIAGRAM_EXTENSION = '.mytmldgm'
+
+# magic, format version, marshal version and the sha256 of the payload
+_HEADER = struct.Struct(f'>{len(PARSED_DIAGRAM_MAGIC)}sHH32s')
+
+
+def is_parsed_diagram(data) -> bool:
+    return isinstance(data, (bytes, bytearray, memoryview)) and bytes(data[:len(PARSED_DIAGRAM_MAGIC)]) == \
+        PARSED_DIAGRAM_MAGIC
+
+
+def serialize_diagram(diagram: Diagram) -> bytes:
+    """
+    The parsed diagram as it is before pruning and mapping: its components with the bounds of their
+    representations and the id of their inferred parents, its connectors and its limits. Mapping only
+    needs the bounds of the representations, the parents are already inferred.
+    """
+    components = []
+    for component in diagram.components:
+        components.append((
+            component.id, component.name, component.type, component.origin.value, component.unique_id,
+            tuple(component.representation.bounds) if component.representation else None,
+            component.parent.id if component.parent is not None else None,
+            component.trustzone
+        ))
+
+    limits = diagram.limits
+    payload = marshal.dumps({
+        "mytml_version": __version__,
+        "limits": (limits.x_floor, limits.y_floor, limits.x_top, limits.y_top) if limits else None,
+        "components": components,
+        "connectors": [(connector.id, connector.from_id, connector.to_id, connector.bidirectional, connector.name)
+                       for connector in diagram.connectors],
+    })
+
+    header = _HEADER.pack(PARSED_DIAGRAM_MAGIC, PARSED_DIAGRAM_FORMAT_VERSION, marshal.version,
+                          hashlib.sha256(payload).digest())
+    return header + payload
+
+
+def read_parsed_diagram(data: bytes) -> dict:
+    """
+    The payload of a parsed diagram file. It is unmarshalled, and marshal is not secure against malicious
+    data: the checksum only detects a corrupt file, not a crafted one. Parsed diagram files must come from a
+    trusted source, only the .vsdx files are validated.
+    """
+    if len(data) < _HEADER.size:
+        raise Exception('Parsed diagram file is not valid. Invalid size')
+
+    magic, format_version, marshal_version, checksum = _HEADER.unpack_from(data)
+    if magic != PARSED_DIAGRAM_MAGIC:
+        raise Exception('Parsed diagram file is not valid. Unknown format')
+    if format_version != PARSED_DIAGRAM_FORMAT_VERSION or marshal_version != marshal.version:
+        raise Exception(f'Parsed diagram file version {format_version}.{marshal_version} is not supported, '
+                        f'parse the diagram again')
+
+    payload = memoryview(data)[_HEADER.size:]
+    if hashlib.sha256(payload).digest() != checksum:
+        raise Exception('Parsed diagram file is not valid. Checksum mismatch')
+
+    parsed = marshal.loads(payload)
+    if parsed["mytml_version"] != __version__:
+        raise Exception(f'Parsed diagram file was built by mytml {parsed["mytml_version"]}, '
+                        f'parse the diagram again')
+    return parsed
+
+
+def deserialize_diagram(data: bytes) -> Diagram:
+    from shapely.geometry import box
+
+    parsed = read_parsed_diagram(data)
+
+    components, parent_ids = {}, {}
+    for component_id, name, type_, origin, unique_id, bounds, parent_id, trustzone in parsed["components"]:
+        components[component_id] = DiagramComponent(
+            id=component_id, name=name, type=type_, origin=DiagramComponentOrigin(origin), trustzone=trustzone,
+            representation=box(*bounds) if bounds is not None else None, unique_id=unique_id
+        )
+        parent_ids[component_id] = parent_id
+    for component_id, component in components.items():
+        component.parent = components.get(parent_ids[component_id])
+
+    limits = parsed["limits"]
+    connectors = [DiagramConnector(connector_id, from_id, to_id, bidirectional, name)
+                  for connector_id, from_id, to_id, bidirectional, name in parsed["connectors"]]
+    return Diagram(list(components.values()), connectors,
+                   DiagramLimits(((limits[0], limits[1]), (limits[2], limits[3]))) if limits else None)
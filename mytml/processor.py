@@ -1,34 +1,255 @@
+import os
 from mytml.validator import Validator
 from mytml.loader import Loader
-from mytml.mapping import MultipleMappingFileValidator, MainMappingFileLoader
+from mytml.mapping import MultipleMappingFileValidator, MappingLoader, MainMappingFileLoader, MappingDocument, \
+    LayeredMappingLoader
+from mytml.compiled_mapping import CompiledMappingLoader, is_compiled_mapping, compile_mappings
 from mytml.visio_parser import VisioParser
 from mytml.otm.otm import OTMRepresentationsPruner, OTMTrustZoneUnifier
+from mytml.otm.otm_validator import OTMValidator
+from mytml.otm.serialization import serialize_otm, deserialize_otm
+from mytml.cache import calculate_cache_key
+from mytml.memory import PeakMemoryTracer
+from mytml.budget import ConversionBudget
+from mytml.diagram import Diagram
+
+
+def available_cpus() -> int:
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def load_mappings(mappings, base_mapping_loader: MappingLoader = None):
+    """
+    The mapping loader of the mapping files, or of a compiled mapping. Given the loader of base mappings, the
+    mapping files are overrides stacked on them, mapping as the base and override files merged would.
+    """
+    if len(mappings) == 1 and is_compiled_mapping(mappings[0]) and base_mapping_loader is None:
+        return CompiledMappingLoader(mappings[0])
+
+    # every file is parsed once, for both its validation and its merge
+    mapping_documents = [MappingDocument(mapping) for mapping in mappings]
+    MultipleMappingFileValidator(mapping_documents).validate()
+    if base_mapping_loader is not None:
+        return LayeredMappingLoader(base_mapping_loader, mapping_documents)
+    mapping_loader = MainMappingFileLoader(mapping_documents)
+    mapping_loader.load()
+    return mapping_loader
+
 
 class Processor:
-    def __init__(self, project_id, source, mappings):
+    def __init__(self, project_id, source, mappings, incremental=False, previous_state=None, cache=None,
+                 mapping_loader=None, trace_memory=False, budget: ConversionBudget = None,
+                 validate_otm=False, topology_only=False, diagram: Diagram = None, parent_workers: int = None,
+                 prepare_mappings_apart=False):
         self.project_id = project_id
         self.project_name = project_id
         self.source = source
         self.mappings = mappings
+        self.incremental = incremental or previous_state is not None
+        self.previous_state = previous_state
+        self.cache = cache
+        self.trace_memory = trace_memory
+        self.budget = budget or ConversionBudget()
+        self.validate_otm = validate_otm
+        self.topology_only = topology_only
+        # a diagram parsed before, by parse_diagram or read with deserialize_diagram, mapped instead of the source
+        self.diagram = diagram
+        # worker processes that infer the parents of the components of large pages by tiles of the page
+        self.parent_workers = parent_workers
+        # the mappings are prepared in another process while the diagram loads, see __can_prepare_mappings_apart
+        self.prepare_mappings_apart = prepare_mappings_apart
 
         self.loader = None
-        self.mapping_loader = None
+        self.mapping_loader = mapping_loader
+        self.state = None
+        self.peak_memory = None
 
     def process(self):
-        Validator(self.source).validate()
+        """
+        Converts the diagram. Raises BudgetExceededError, with the timings of the stages run until then, when
+        the conversion goes over its budget or is cancelled through its cancellation token, and
+        OTMValidationError when validate_otm is set and the OTM built is not valid
+        """
+        self.budget.start()
+        if not self.trace_memory:
+            return self.__process_cached()
 
-        self.loader = Loader(self.source)
-        self.loader.load()
+        with PeakMemoryTracer() as tracer:
+            otm = self.__process_cached()
+        self.peak_memory = tracer.peak
+        return otm
+
+    def __process_cached(self):
+        # an incremental conversion needs the parsed diagram to build its state
+        if not self.cache or self.incremental or self.diagram is not None:
+            return self.__process()
+
+        mapping_fingerprint = self.mapping_loader.get_fingerprint() if self.mapping_loader is not None else None
+        with open(self.source.name, 'rb') as f:
+            cache_key = calculate_cache_key(f.read(), self.mappings, self.project_id, self.topology_only,
+                                            mapping_fingerprint)
+
+        cached_otm = self.cache.get(cache_key)
+        if cached_otm is not None:
+            otm = deserialize_otm(cached_otm)
+            # the cached OTM may come from a conversion that did not validate it
+            self.__validate_otm(otm)
+            return otm
+
+        otm = self.__process()
+        self.cache.put(cache_key, serialize_otm(otm))
+        return otm
+
+    def __process(self):
+        if self.diagram is not None:
+            self.__load_mappings()
+            visio = self.diagram
+        else:
+            self.__load(incremental=self.incremental, previous_state=self.previous_state)
+            self.state = self.loader.get_state()
+            visio = self.loader.get_visio()
+            self.loader = None
+
+        with self.budget.stage('map'):
+            self.budget.check()
+            otm = VisioParser(self.project_id, self.project_name, visio, self.mapping_loader,
+                              self.topology_only).build_otm()
+        # the diagram and its geometry are not needed once the representations are calculated
+        visio = None
+
+        with self.budget.stage('prune'):
+            self.budget.check()
+            OTMRepresentationsPruner(otm).prune()
+            OTMTrustZoneUnifier(otm).unify()
+
+        self.__validate_otm(otm)
+        return otm
+
+    def __validate_otm(self, otm):
+        if self.validate_otm:
+            with self.budget.stage('validate_otm'):
+                OTMValidator(otm).validate()
+
+    def process_stream(self):
+        """
+        Generator of the OTM elements as {"type": ..., "data": ...} records, yielded as soon as each one
+        is built instead of holding the whole model
+        """
+        from mytml.streaming import OTMRecordStream
 
-        mapping_validator = MultipleMappingFileValidator(self.mappings).validate()
-        self.mapping_loader = MainMappingFileLoader(self.mappings)
-        self.mapping_loader.load()
+        self.budget.start()
+        if self.diagram is not None:
+            self.__load_mappings()
+            visio = self.diagram
+        else:
+            self.__load(streaming=True)
+            visio = self.loader.get_visio()
+            self.loader = None
 
-        visio = self.loader.get_visio()
-        otm = VisioParser(self.project_id, self.project_name, visio, self.mapping_loader).build_otm()
+        yield from OTMRecordStream(self.project_id, self.project_name, visio, self.mapping_loader,
+                                   self.topology_only).records()
 
-        OTMRepresentationsPruner(otm).prune()
-        OTMTrustZoneUnifier(otm).unify()
+    def parse_diagram(self) -> Diagram:
+        """
+        Validates and parses the diagram, inferring the parents of its components, without mapping it.
+        Mapping does not change the diagram, so it may be mapped with several mappings, even at the same time,
+        by Processors given it as their diagram, and kept with serialize_diagram.
+        """
+        self.budget.start()
+        self.__load_diagram(Loader(self.source, budget=self.budget, parent_workers=self.parent_workers))
+
+        diagram = self.loader.get_visio()
+        self.loader = None
+        return diagram
+
+    def inspect(self):
+        """
+        Validates the diagram and counts its shapes, connectors and boundaries and collects the labels and
+        master unique ids it uses, reading only its page and masters XML: no geometry, parents nor OTM are
+        built. Given mappings, the ones they do not cover are reported too.
+        """
+        from mytml.inspection import inspect_diagram
+
+        self.budget.start()
+        with self.budget.stage('validate'):
+            self.budget.check()
+            Validator(self.source).validate()
+
+        mapped_labels = None
+        if self.mapping_loader is not None or self.mappings:
+            self.__load_mappings()
+            mapped_labels = self.mapping_loader.get_mapped_labels()
+
+        with self.budget.stage('inspect'):
+            self.budget.check()
+            return inspect_diagram(self.source.name, mapped_labels)
+
+    def __load_mappings(self):
+        if self.mapping_loader is None:
+            with self.budget.stage('mappings'):
+                self.budget.check()
+                self.mapping_loader = load_mappings(self.mappings)
+
+    def __load(self, **loader_arguments):
+        if self.mapping_loader is not None or not self.__can_prepare_mappings_apart():
+            mappings_error = None
+            if self.mapping_loader is None:
+                # loaded first, so the parser knows the shapes no mapping can match
+                with self.budget.stage('mappings'):
+                    self.budget.check()
+                    try:
+                        self.mapping_loader = load_mappings(self.mappings)
+                    except Exception as e:
+                        mappings_error = e
+            # an invalid diagram is reported before invalid mappings
+            self.__load_diagram(self.__create_loader(loader_arguments))
+            if mappings_error is not None:
+                raise mappings_error
+            return
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        # the mappings do not depend on the diagram, so they are prepared while the diagram is loaded, in
+        # another process as both are bound by the interpreter. They come back compiled, which is the
+        # fastest to transfer and to load.
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            compiled_mappings = executor.submit(compile_mappings, list(enumerate(self.mappings)))
+            # an invalid diagram is reported before invalid mappings, as when they were prepared one after the other
+            self.__load_diagram(self.__create_loader(loader_arguments))
+            # the time spent waiting for them, once the diagram is loaded
+            with self.budget.stage('mappings'):
+                self.mapping_loader = CompiledMappingLoader(compiled_mappings.result())
+
+    def __create_loader(self, loader_arguments: dict) -> Loader:
+        mapped_labels = self.mapping_loader.get_mapped_labels() if self.mapping_loader is not None else None
+        return Loader(self.source, budget=self.budget, mapped_labels=mapped_labels,
+                      parent_workers=self.parent_workers, **loader_arguments)
+
+    def __can_prepare_mappings_apart(self) -> bool:
+        """
+        Only on request: a process is started for every conversion, which pays off only for mappings slower
+        to load than starting it. And the parser does not know yet which shapes no mapping can match, so it
+        builds the geometry of all of them, the unmapped ones are pruned once mapped. See
+        benchmarks/mappings_apart.py.
+        """
+        import multiprocessing
+
+        if not self.prepare_mappings_apart or available_cpus() < 2:
+            return False
+        # daemon processes, like the ones of a multiprocessing pool, cannot start others
+        if multiprocessing.current_process().daemon:
+            return False
+        return not (len(self.mappings) == 1 and is_compiled_mapping(self.mappings[0]))
+
+    def __load_diagram(self, loader: Loader):
+        with self.budget.stage('validate'):
+            self.budget.check()
+            Validator(self.source).validate()
+
+        self.loader = loader
+        self.loader.load()
 
-        # validate otm function
-        return otm
\ No newline at end of file
+    def get_state(self):
+        return self.state
\ No newline at end of file
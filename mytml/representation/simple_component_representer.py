@@ -1,12 +1,18 @@
 from shapely.geometry import Polygon
 from vsdx import Shape
 from mytml.utils import get_limits
+from mytml.geometry import GeometryTable
 
 
 class SimpleComponentRepresenter:
 
+    def __init__(self, geometry: GeometryTable = None):
+        self.geometry = geometry
+
     def build_representation(self, shape: Shape) -> Polygon:
-        limits = get_limits(shape)
+        limits = self.geometry.get_limits(shape.ID) \
+            if self.geometry is not None and shape.ID in self.geometry \
+            else get_limits(shape)
 
         points = [(limits[0][0], limits[0][1]),
                   (limits[0][0], limits[1][1]),
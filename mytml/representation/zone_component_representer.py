@@ -4,6 +4,7 @@ from shapely.geometry import Polygon
 from vsdx import Shape
 
 from mytml.diagram import DiagramLimits
+from mytml.geometry import GeometryTable
 from mytml.representation.zone.irregular_zones import irregular_zones
 from mytml.representation.zone.regular_zones import regular_zones
 from mytml.utils import get_normalized_angle, get_y_center, get_x_center
@@ -50,11 +51,14 @@ def represent_irregular_zone(angle: float, some_point: tuple, limits: DiagramLim
 
 class ZoneComponentRepresenter:
 
-    def __init__(self, diagram_limits: DiagramLimits):
+    def __init__(self, diagram_limits: DiagramLimits, geometry: GeometryTable = None):
         self.diagram_limits = diagram_limits
+        self.geometry = geometry
 
     def build_representation(self, shape: Shape) -> Polygon:
         angle = get_normalized_angle(shape)
-        shape_center = (get_x_center(shape), get_y_center(shape))
+        shape_center = self.geometry.get_center(shape.ID) \
+            if self.geometry is not None and shape.ID in self.geometry \
+            else (get_x_center(shape), get_y_center(shape))
 
         return represent_quadrant(angle, shape_center, self.diagram_limits) or represent_irregular_zone(angle, shape_center, self.diagram_limits)
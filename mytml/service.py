@@ -0,0 +1,199 @@
+import json
+import math
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from multiprocessing import Pool, TimeoutError
+from urllib.parse import urlparse, parse_qs
+from mytml.worker import init_worker, convert_upload, read_mapping
+from mytml.validator import MAX_SIZE
+
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_QUEUE = 16
+DEFAULT_PROJECT_ID = 'project'
+# seconds a conversion may take without a time limit, and the time to spare over the limit when it has one
+DEFAULT_CONVERSION_TIME = 300
+CONVERSION_TIME_MARGIN = 5
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+
+
+class ServiceMetrics:
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.started = time.monotonic()
+        self.requests = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.in_flight = 0
+        self.latency_counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.__lock = threading.Lock()
+
+    def try_accept(self, max_queue: int) -> bool:
+        with self.__lock:
+            self.requests += 1
+            if self.in_flight >= self.workers + max_queue:
+                self.rejected += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def finish(self, seconds: float, failed: bool):
+        with self.__lock:
+            self.in_flight -= 1
+            if failed:
+                self.failed += 1
+            else:
+                self.completed += 1
+            self.latency_sum += seconds
+            self.latency_counts[self.__bucket(seconds)] += 1
+
+    @staticmethod
+    def __bucket(seconds: float) -> int:
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                return i
+        return len(LATENCY_BUCKETS)
+
+    def json(self):
+        with self.__lock:
+            uptime = time.monotonic() - self.started
+            handled = self.completed + self.failed
+            cumulative, histogram = 0, {}
+            for bound, count in zip(LATENCY_BUCKETS + ['+Inf'], self.latency_counts):
+                cumulative += count
+                histogram[str(bound)] = cumulative
+
+            return {
+                "uptime": uptime,
+                "workers": self.workers,
+                "requests": self.requests,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "inFlight": self.in_flight,
+                "queueLength": max(0, self.in_flight - self.workers),
+                "throughput": handled / uptime if uptime else 0.0,
+                "latency": {
+                    "count": handled,
+                    "sum": self.latency_sum,
+                    "buckets": histogram
+                }
+            }
+
+
+class ConversionRequestHandler(BaseHTTPRequestHandler):
+    server: 'ConversionService'
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == '/metrics':
+            self.__send_json(200, self.server.metrics.json())
+        elif path == '/health':
+            self.__send_json(200, {"status": "ok"})
+        else:
+            self.__send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != '/convert':
+            self.__send_json(404, {"error": "Not found"})
+            return
+
+        content_length = self.headers.get('Content-Length')
+        if content_length is None:
+            self.__send_json(411, {"error": "Content-Length is required"})
+            return
+        try:
+            size = int(content_length)
+        except ValueError:
+            size = -1
+        if size < 0:
+            self.__send_json(400, {"error": f"Invalid Content-Length {content_length}"})
+            return
+        if size > MAX_SIZE:
+            self.__send_json(413, {"error": "File Size Validation Error"})
+            return
+        data = self.rfile.read(size)
+
+        if not self.server.metrics.try_accept(self.server.max_queue):
+            self.__send_json(503, {"error": "Conversion queue is full"})
+            return
+
+        start = time.perf_counter()
+        otm, error, timed_out = None, 'Conversion failed', False
+        try:
+            project_id = parse_qs(url.query).get('project_id', [DEFAULT_PROJECT_ID])[0]
+            conversion = self.server.pool.apply_async(convert_upload, (data, project_id))
+            _, _, otm, error, _ = conversion.get(timeout=self.server.conversion_timeout)
+        except TimeoutError:
+            timed_out = True
+        finally:
+            self.server.metrics.finish(time.perf_counter() - start, otm is None)
+
+        if timed_out:
+            self.__send_json(504, {"error": f"The conversion did not finish in {self.server.conversion_timeout}s"})
+        elif otm is None:
+            self.__send_json(400, {"error": error})
+        else:
+            self.__send(200, otm.encode('utf-8'))
+
+    def __send_json(self, status: int, body: dict):
+        self.__send(status, json.dumps(body).encode('utf-8'))
+
+    def __send(self, status: int, body: bytes):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class ConversionService(ThreadingHTTPServer):
+    """
+    HTTP conversion service backed by a pool of worker processes forked at start up, each of them
+    holding the loaded mappings. POST /convert?project_id=<id> takes the .vsdx bytes as body and
+    answers the OTM, GET /metrics answers the service metrics. A request waits for its conversion as long as
+    the conversions queued before it and its own may take, conversion_timeout seconds, and is answered 504
+    after that, even if a worker is stuck.
+    """
+    daemon_threads = True
+
+    def __init__(self, mapping_paths: [str], host: str = '127.0.0.1', port: int = 0, workers: int = DEFAULT_WORKERS,
+                 max_queue: int = DEFAULT_MAX_QUEUE, cache_dir: str = None, limits: dict = None,
+                 conversion_timeout: float = None):
+        from mytml.processor import load_mappings
+
+        # invalid mappings fail here, instead of in every worker the pool keeps restarting
+        load_mappings([read_mapping(path) for path in mapping_paths])
+
+        self.max_queue = max_queue
+        if conversion_timeout is None:
+            conversion_time = (limits or {}).get('time_limit') or DEFAULT_CONVERSION_TIME
+            # the conversions of the queue run before it, as many at a time as there are workers
+            conversion_timeout = (conversion_time + CONVERSION_TIME_MARGIN) * (1 + math.ceil(max_queue / workers))
+        self.conversion_timeout = conversion_timeout
+        self.metrics = ServiceMetrics(workers)
+        self.pool = Pool(processes=workers, initializer=init_worker, initargs=(mapping_paths, cache_dir, False, limits))
+        self.__thread = None
+        super().__init__((host, port), ConversionRequestHandler)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self.__thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        if self.__thread:
+            self.shutdown()
+        self.server_close()
+        self.pool.terminate()
+        self.pool.join()
+        if self.__thread:
+            self.__thread.join()
@@ -0,0 +1,186 @@
+import json
+from vsdx import Shape, namespace
+from mytml.diagram import Diagram, DiagramComponentOrigin, DiagramPruner
+from mytml.geometry import GeometryTable
+from mytml.connects_index import ConnectsIndex
+from mytml.vsdx_parser import VsdxParser
+from mytml.representation.simple_component_representer import SimpleComponentRepresenter
+from mytml.representation.zone_component_representer import ZoneComponentRepresenter
+from mytml.otm.otm import OTM_VERSION
+from mytml.otm.diagram_mapper import DiagramComponentMapper, DiagramTrustzoneMapper, DiagramConnectorMapper
+from mytml.otm.representation import DiagramRepresentation, RepresentationType
+from mytml.otm.representation_calculator import RepresentationCalculator, NoRepresentationCalculator, \
+    has_representation, build_size_object, calculate_diagram_size
+
+
+def iter_child_shapes(page):
+    # Page.child_shapes builds every Shape of the page up front, this builds them one at a time
+    shapes_xml = page.xml.find(f"{namespace}Shapes")
+    if shapes_xml is None:
+        return
+
+    top_shape = Shape(xml=shapes_xml, parent=page, page=page)
+    for element in shapes_xml:
+        if 'Shape' in element.tag:
+            yield Shape(xml=element, parent=top_shape, page=page)
+
+
+def write_ndjson(records, stream):
+    for record in records:
+        stream.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+
+class StreamingVsdxParser(VsdxParser):
+    """
+    VsdxParser that reads the page in a single pass and keeps only what parent inference needs: the
+    geometry table, the diagram components and the connectors
+    """
+
+    def __init__(self, component_factory, connector_factory, budget=None, parent_workers: int = None):
+        super().__init__(component_factory, connector_factory, budget, parent_workers=parent_workers)
+        self.__boundary_shapes = []
+
+    def parse(self, diagram_filename):
+        with self._budget.stage('extract'):
+            self.page = self._load_visio_page_from_file(diagram_filename)
+            self._connects = ConnectsIndex.from_page(self.page)
+            self._check_page_budget()
+            self._geometry = GeometryTable()
+            self._component_representer = SimpleComponentRepresenter(self._geometry)
+
+            for shape in iter_child_shapes(self.page):
+                self._budget.check()
+                self._geometry.add(shape)
+                self._load_page_element(shape)
+
+            self._diagram_limits = self._calculate_diagram_limits()
+            self._zone_representer = ZoneComponentRepresenter(self._diagram_limits, self._geometry)
+            for position, shape in self.__boundary_shapes:
+                self._visio_components[position] = self.component_factory.create_component(
+                    shape, DiagramComponentOrigin.BOUNDARY, self._zone_representer
+                )
+            self.__boundary_shapes = []
+            self._release_page()
+
+        with self._budget.stage('parents'):
+            self._calculate_parents()
+
+        return Diagram(self._visio_components, self._visio_connectors, self._diagram_limits)
+
+    def _add_boundary_component(self, component_shape):
+        # zone representations need the diagram limits, which are known once the whole page has been read
+        self.__boundary_shapes.append((len(self._visio_components), component_shape))
+        self._visio_components.append(None)
+
+
+def _has_representation_as(component, trustzone: bool) -> bool:
+    flag = component.trustzone
+    component.trustzone = trustzone
+    try:
+        return has_representation(component)
+    finally:
+        component.trustzone = flag
+
+
+class OTMRecordStream:
+    """
+    Maps a parsed diagram to OTM records, one per element, yielded as soon as each element is built.
+    The records hold the same elements as the OTM that Processor.process() returns.
+    """
+
+    def __init__(self, project_id: str, project_name: str, diagram, mapping_loader, topology_only=False):
+        self.project_id = project_id
+        self.project_name = project_name
+        self.diagram = diagram
+        self.mapping_loader = mapping_loader
+        self.topology_only = topology_only
+
+        self.representation_id = f'{self.project_id}-diagram'
+        self._trustzone_mappings = self.mapping_loader.get_trustzone_mappings()
+        self._default_trustzone = self.mapping_loader.get_default_otm_trustzone()
+
+    def records(self):
+        self.diagram = DiagramPruner(self.diagram, self.mapping_loader.get_all_labels(),
+                                     self.mapping_loader.get_label_pattern_matcher()).run()
+
+        component_mapper = DiagramComponentMapper(self.diagram.components,
+                                                  self.mapping_loader.get_component_mappings(),
+                                                  self._trustzone_mappings, self._default_trustzone, None,
+                                                  self.mapping_loader.get_component_pattern_matcher())
+        trustzone_mapper = DiagramTrustzoneMapper(self.diagram.components, self._trustzone_mappings, None)
+
+        any_representation_empty, default_trustzone_used, trustzone_ids = \
+            self.__scan(component_mapper, trustzone_mapper)
+
+        # an element without representation makes the whole model drop them, so they are not calculated
+        representation_calculator = NoRepresentationCalculator() if any_representation_empty or self.topology_only \
+            else RepresentationCalculator(self.representation_id, self.diagram.limits)
+        component_mapper.representation_calculator = representation_calculator
+        trustzone_mapper.representation_calculator = representation_calculator
+
+        yield {"type": "project", "data": {"otmVersion": OTM_VERSION, "name": self.project_name,
+                                           "id": self.project_id}}
+        if not self.topology_only:
+            yield {"type": "representation", "data": self.__build_diagram_representation().json()}
+
+        component_ids = set()
+        for component in self.diagram.components:
+            if component_mapper.is_mapped(component):
+                otm_component = component_mapper.build_otm_component(component)
+                otm_component.parent = trustzone_ids.get(otm_component.parent, otm_component.parent)
+                component_ids.add(otm_component.id)
+                yield {"type": "component", "data": otm_component.json()}
+
+        yield from self.__trustzone_records(trustzone_mapper, trustzone_ids, default_trustzone_used)
+
+        for connector in self.diagram.connectors:
+            if connector.from_id in component_ids and connector.to_id in component_ids:
+                yield {"type": "dataflow", "data": DiagramConnectorMapper.build_otm_dataflow(connector).json()}
+
+    def __scan(self, component_mapper, trustzone_mapper):
+        any_representation_empty = False
+        default_trustzone_used = False
+        trustzone_ids = {}
+
+        for component in self.diagram.components:
+            if component_mapper.is_mapped(component):
+                default_trustzone_used = default_trustzone_used or component.parent is None
+                any_representation_empty = any_representation_empty or not _has_representation_as(component, False)
+            if trustzone_mapper.is_trustzone(component):
+                trustzone_ids[component.id] = \
+                    DiagramTrustzoneMapper.find_type(self._trustzone_mappings[component.name])
+                any_representation_empty = any_representation_empty or not _has_representation_as(component, True)
+
+        if self._default_trustzone:
+            trustzone_ids[self._default_trustzone.id] = self._default_trustzone.type
+            # the default trust zone has no representation
+            any_representation_empty = any_representation_empty or default_trustzone_used
+
+        return any_representation_empty, default_trustzone_used, trustzone_ids
+
+    def __trustzone_records(self, trustzone_mapper, trustzone_ids: dict, default_trustzone_used: bool):
+        emitted_ids = set()
+
+        for component in self.diagram.components:
+            if not trustzone_mapper.is_trustzone(component):
+                continue
+            component.trustzone = True
+            trustzone = trustzone_mapper.build_otm_trustzone(component)
+            trustzone.parent = trustzone_ids.get(trustzone.parent, trustzone.parent)
+            trustzone.id = trustzone.type
+            if trustzone.id not in emitted_ids:
+                emitted_ids.add(trustzone.id)
+                yield {"type": "trustZone", "data": trustzone.json()}
+
+        if default_trustzone_used and self._default_trustzone.type not in emitted_ids:
+            data = self._default_trustzone.json()
+            data["id"] = self._default_trustzone.type
+            yield {"type": "trustZone", "data": data}
+
+    def __build_diagram_representation(self):
+        return DiagramRepresentation(
+            id_=self.representation_id,
+            name=f'{self.project_id} Diagram Representation',
+            type_=RepresentationType.DIAGRAM,
+            size=build_size_object(calculate_diagram_size(self.diagram.limits))
+        )
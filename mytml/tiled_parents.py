@@ -0,0 +1,119 @@
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy
+import shapely
+from shapely import STRtree
+
+# below it, starting the worker processes takes longer than inferring the parents one after the other
+PARALLEL_PARENTS_MIN_COMPONENTS = 500
+# more tiles than workers, so that a crowded tile does not leave the other workers waiting
+TILES_PER_WORKER = 4
+
+
+def can_calculate_parents_in_tiles(components: list, workers: int) -> bool:
+    if workers is None or workers < 2 or len(components) < PARALLEL_PARENTS_MIN_COMPONENTS:
+        return False
+    # daemon processes, like the ones of a multiprocessing pool, cannot start others
+    if multiprocessing.current_process().daemon:
+        return False
+    # the serial inference fails on them as before
+    return all(component.representation is not None for component in components)
+
+
+def get_tile_indexes(values, floor: float, tile_size: float, tiles_per_side: int):
+    # the same division for the children and the candidates, so a candidate spans the tile of any point it holds
+    return numpy.clip(numpy.floor((values - floor) / tile_size), 0, tiles_per_side - 1).astype(numpy.int64)
+
+
+def split_in_tiles(bounds, limits, tiles_per_side: int) -> list:
+    """
+    Splits the page in a grid of tiles, each with the components whose centre is in it, which are the
+    children whose parents are inferred there, and the ones whose bounds reach it, which are the parent
+    candidates. A parent holds the bounds of its children, so it reaches the tile of each of them. Returns
+    the positions of the candidates of each tile, in page order, and the positions of its children among them.
+    """
+    x_floor, y_floor, x_top, y_top = limits.x_floor, limits.y_floor, limits.x_top, limits.y_top
+    if not x_top > x_floor or not y_top > y_floor:
+        # the default limits of a page without shapes away from its origin
+        x_floor, y_floor = bounds[:, 0].min(), bounds[:, 1].min()
+        x_top, y_top = bounds[:, 2].max(), bounds[:, 3].max()
+    tile_width = (x_top - x_floor) / tiles_per_side or 1.0
+    tile_height = (y_top - y_floor) / tiles_per_side or 1.0
+
+    child_columns = get_tile_indexes((bounds[:, 0] + bounds[:, 2]) / 2, x_floor, tile_width, tiles_per_side)
+    child_rows = get_tile_indexes((bounds[:, 1] + bounds[:, 3]) / 2, y_floor, tile_height, tiles_per_side)
+    first_columns = get_tile_indexes(bounds[:, 0], x_floor, tile_width, tiles_per_side)
+    last_columns = get_tile_indexes(bounds[:, 2], x_floor, tile_width, tiles_per_side)
+    first_rows = get_tile_indexes(bounds[:, 1], y_floor, tile_height, tiles_per_side)
+    last_rows = get_tile_indexes(bounds[:, 3], y_floor, tile_height, tiles_per_side)
+
+    tiles = []
+    for column in range(tiles_per_side):
+        for row in range(tiles_per_side):
+            children = numpy.flatnonzero((child_columns == column) & (child_rows == row))
+            if not len(children):
+                continue
+            candidates = numpy.flatnonzero((first_columns <= column) & (last_columns >= column)
+                                           & (first_rows <= row) & (last_rows >= row))
+            tiles.append((candidates, numpy.searchsorted(candidates, children)))
+    return tiles
+
+
+def calculate_tile_parents(wkb_geometries, id_codes, child_positions) -> list:
+    """
+    Runs in the worker processes. The parent of each child of a tile, as ParentCalculator infers it: the
+    candidate that contains it with the smallest area, the first one in page order when several have the
+    same area. The candidates come in page order as WKB, with their ids as integer codes, and the children
+    and parents are positions among them, -1 for the children without parent.
+    """
+    geometries = shapely.from_wkb(wkb_geometries)
+    children = geometries[child_positions]
+
+    # a candidate containing a child holds its bounds, so the index finds every one of them
+    child_indexes, candidate_positions = STRtree(geometries).query(children)
+    contained = (id_codes[candidate_positions] != id_codes[child_positions[child_indexes]]) \
+        & shapely.contains(geometries[candidate_positions], children[child_indexes])
+    child_indexes, candidate_positions = child_indexes[contained], candidate_positions[contained]
+
+    # sorted by child, area and page order, the first candidate of each child is its parent
+    order = numpy.lexsort((candidate_positions, shapely.area(geometries)[candidate_positions], child_indexes))
+    child_indexes, candidate_positions = child_indexes[order], candidate_positions[order]
+    first = numpy.ones(len(child_indexes), dtype=bool)
+    first[1:] = child_indexes[1:] != child_indexes[:-1]
+
+    parents = numpy.full(len(child_positions), -1, dtype=numpy.int64)
+    parents[child_indexes[first]] = candidate_positions[first]
+    return parents.tolist()
+
+
+def calculate_parents_in_tiles(components: list, limits, workers: int, budget=None) -> list:
+    """
+    The parents ParentCalculator infers for the components, None for the ones without parent, inferred by
+    tiles of the page in worker processes. The workers are given the geometry as WKB arrays instead of
+    shapely objects. The budget counts the containment tests of the serial inference.
+    """
+    representations = [component.representation for component in components]
+    wkb_geometries = shapely.to_wkb(representations)
+    codes = {}
+    id_codes = numpy.array([codes.setdefault(component.id, len(codes)) for component in components])
+    tiles_per_side = math.ceil(math.sqrt(workers * TILES_PER_WORKER))
+    tiles = split_in_tiles(shapely.bounds(representations), limits, tiles_per_side)
+
+    parents = [None] * len(components)
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = [(candidates, child_positions, executor.submit(
+            calculate_tile_parents, wkb_geometries[candidates], id_codes[candidates], child_positions
+        )) for candidates, child_positions in tiles]
+
+        for candidates, child_positions, future in futures:
+            if budget:
+                budget.count_containment_tests(len(child_positions) * len(components))
+            for child_position, parent_position in zip(child_positions, future.result()):
+                if parent_position >= 0:
+                    parents[candidates[child_position]] = components[candidates[parent_position]]
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+    return parents
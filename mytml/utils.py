@@ -1,12 +1,36 @@
+from __future__ import annotations
 import re
 from math import pi
 import random
 import uuid
-from vsdx import Shape
+from typing import TYPE_CHECKING
+from xml.etree.ElementTree import Element
+from mytml.master_cache import get_master_attributes
+
+if TYPE_CHECKING:
+    from vsdx import Shape
+
+# same as vsdx.namespace, kept here so that importing the helpers does not load vsdx
+VISIO_NAMESPACE = '{http://schemas.microsoft.com/office/visio/2012/main}'
+
+WHITESPACES_REGEX = re.compile(r"\s+")
+
+# the shapes with it in their name are boundaries
+BOUNDARY_SHAPE_NAME = "Curved panel"
+
+
+def get_text(shape: Shape) -> str:
+    # same resolution as Shape.text, but the master text comes from the master cache
+    text_element = shape.xml.find(f"{VISIO_NAMESPACE}Text")
+    if isinstance(text_element, Element):
+        return "".join(text_element.itertext())
+
+    master = get_master_attributes(shape) if shape.master_page_ID else None
+    return master.text if master else ""
 
 
 def get_shape_text(shape: Shape) -> str:
-    result = shape.text
+    result = get_text(shape)
     if not result:
         result = get_child_shapes_text(shape.child_shapes)
 
@@ -17,14 +41,8 @@ def get_shape_text(shape: Shape) -> str:
 
 
 def get_master_shape_text(shape: Shape) -> str:
-    if not shape.master_shape:
-        return ""
-
-    result = shape.master_shape.text
-    if not result:
-        result = get_child_shapes_text(shape.master_shape.child_shapes)
-
-    return (result or "").strip()
+    master = get_master_attributes(shape)
+    return master.shape_text if master else ""
 
 
 def get_unique_id_text(shape: Shape) -> str:
@@ -38,7 +56,7 @@ def get_unique_id_text(shape: Shape) -> str:
 def get_child_shapes_text(shapes: [Shape]) -> str:
     if not shapes:
         return ""
-    return "".join(shape.text for shape in shapes)
+    return "".join(get_text(shape) for shape in shapes)
 
 
 def get_x_center(shape: Shape) -> float:
@@ -53,16 +71,30 @@ def get_width(shape: Shape) -> float:
     if "Width" in shape.cells:
         return float(shape.cells["Width"].value)
 
-    if "Width" in shape.master_shape.cells:
-        return float(shape.master_shape.cells["Width"].value)
+    return get_master_attributes(shape).width
 
 
 def get_height(shape: Shape) -> float:
     if "Height" in shape.cells:
         return float(shape.cells["Height"].value)
 
-    if "Height" in shape.master_shape.cells:
-        return float(shape.master_shape.cells["Height"].value)
+    return get_master_attributes(shape).height
+
+
+def get_begin_arrow(shape: Shape) -> str:
+    if "BeginArrow" in shape.cells:
+        return shape.cells["BeginArrow"].value
+
+    master = get_master_attributes(shape) if shape.master_page_ID is not None else None
+    return master.begin_arrow if master else None
+
+
+def get_end_arrow(shape: Shape) -> str:
+    if "EndArrow" in shape.cells:
+        return shape.cells["EndArrow"].value
+
+    master = get_master_attributes(shape) if shape.master_page_ID is not None else None
+    return master.end_arrow if master else None
 
 
 def get_normalized_angle(shape: Shape) -> float:
@@ -96,7 +128,7 @@ def normalize_label(label):
     # replace by ' ' any '\n'
     label_normalized = label.replace("\n", " ")
     # replace multiple spaces in a row (2 or more) by a single one
-    label_normalized = re.sub(r"\s+", " ", label_normalized)
+    label_normalized = WHITESPACES_REGEX.sub(" ", label_normalized)
     # strip any leading or trailing space
     label_normalized = label_normalized.strip()
 
@@ -1,5 +1,4 @@
 import os
-import magic as magik
 from zipfile import ZipFile
 
 MAX_SIZE = 10 * 1024 * 1024
@@ -22,6 +21,8 @@ class Validator:
             raise Exception("File Size Validation Error")
 
     def _get_mime_type(self):
+        import magic as magik
+
         magic = magik.Magic(mime=True)
         return magic.from_file(self.file.name)
 
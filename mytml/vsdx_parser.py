@@ -1,7 +1,10 @@
 from vsdx import VisioFile
 from mytml.diagram import Diagram, DiagramLimits, DiagramComponentOrigin
-from mytml.utils import get_limits, get_shape_text
-from mytml.parent_calculator import ParentCalculator
+from mytml.utils import get_shape_text, get_limits, VISIO_NAMESPACE, BOUNDARY_SHAPE_NAME
+from mytml.geometry import GeometryTable
+from mytml.connects_index import ConnectsIndex
+from mytml.parent_calculator import calculate_parents
+from mytml.budget import ConversionBudget
 from mytml.representation.simple_component_representer import SimpleComponentRepresenter
 from mytml.representation.zone_component_representer import ZoneComponentRepresenter
 
@@ -10,17 +13,35 @@ DIAGRAM_LIMITS_PADDING = 2
 DEFAULT_DIAGRAM_LIMITS = DiagramLimits(((1000, 1000), (1000, 1000)))
 
 
+def count_child_shapes(page) -> int:
+    # counted on the page xml, before the shapes are built
+    shapes_xml = page.xml.find(f"{VISIO_NAMESPACE}Shapes")
+    return 0 if shapes_xml is None else len([element for element in shapes_xml if 'Shape' in element.tag])
+
+
 class VsdxParser:
-    def __init__(self, component_factory, connector_factory):
+    def __init__(self, component_factory, connector_factory, budget: ConversionBudget = None, mapped_labels=None,
+                 parent_workers: int = None):
         self.component_factory = component_factory
         self.connector_factory = connector_factory
+        self._budget = budget or ConversionBudget()
+        # MappedLabels of the mappings the diagram is converted with, to drop the components none of them
+        # can match before building their geometry. Without them every component is kept.
+        self.mapped_labels = mapped_labels
+        # worker processes that infer the parents of large pages by tiles, None to infer them here
+        self.parent_workers = parent_workers
 
         self._zone_representer = None
         self._component_representer = None
 
         self.page = None
+        self._shapes = []
+        self._geometry = None
+        self._connects = ConnectsIndex()
+        self._diagram_limits = None
         self._visio_components = []
         self._visio_connectors = []
+        self._unmapped_components = []
 
     @staticmethod
     def _load_visio_page_from_file(diagram_filename):
@@ -28,26 +49,44 @@ class VsdxParser:
             return f.pages[0]
 
     def parse(self, diagram_filename):
-        self.page = self._load_visio_page_from_file(diagram_filename)
-
-        diagram_limits = self._calculate_diagram_limits()
-        self._component_representer = SimpleComponentRepresenter()
-        self._zone_representer = ZoneComponentRepresenter(diagram_limits)
-        self._load_page_elements()
-        self._calculate_parents()
+        with self._budget.stage('extract'):
+            self.page = self._load_visio_page_from_file(diagram_filename)
+            self._connects = ConnectsIndex.from_page(self.page)
+            self._check_page_budget()
+            self._shapes = self.page.child_shapes
+            self._geometry = GeometryTable.from_shapes(self._shapes)
+
+            self._diagram_limits = self._calculate_diagram_limits()
+            self._component_representer = SimpleComponentRepresenter(self._geometry)
+            self._zone_representer = ZoneComponentRepresenter(self._diagram_limits, self._geometry)
+            self._load_page_elements()
+            self._release_page()
+
+        with self._budget.stage('parents'):
+            self._calculate_parents()
+
+        return Diagram(self._visio_components, self._visio_connectors, self._diagram_limits)
+
+    def _release_page(self):
+        # the diagram components and connectors are all that is left to use of the vsdx tree
+        self.page = None
+        self._shapes = []
+        self._geometry = None
+        self._connects = ConnectsIndex()
+        self._component_representer = None
+        self._zone_representer = None
 
-        return Diagram(self._visio_components, self._visio_connectors, diagram_limits)
+    def _check_page_budget(self):
+        self._budget.check()
+        self._budget.check_shapes(count_child_shapes(self.page))
+        self._budget.check_connectors(len(self._connects.connector_ids))
 
-    @staticmethod
-    def _is_connector(shape):
-        for connect in shape.connects:
-            if shape.ID == connect.connector_shape_id:
-                return True
-        return False
+    def _is_connector(self, shape):
+        return self._connects.is_connector(shape.ID)
 
     @staticmethod
     def _is_boundary(shape):
-        return shape.shape_name is not None and "Curved panel" in shape.shape_name
+        return shape.shape_name is not None and BOUNDARY_SHAPE_NAME in shape.shape_name
 
     def _is_component(self, shape):
         return get_shape_text(shape) and not self._is_connector(shape)
@@ -56,7 +95,7 @@ class VsdxParser:
         floor_coordinates = [None, None]
         top_coordinates = [0, 0]
 
-        for shape_limits in map(get_limits, self.page.child_shapes):
+        for shape_limits in self._geometry.iter_limits():
             if not floor_coordinates[0] or shape_limits[0][0] < floor_coordinates[0]:
                 floor_coordinates[0] = shape_limits[0][0] - DIAGRAM_LIMITS_PADDING
 
@@ -76,20 +115,62 @@ class VsdxParser:
         )
 
     def _load_page_elements(self):
-        for shape in self.page.child_shapes:
-            if self._is_connector(shape):
-                self._add_connector(shape)
-            elif self._is_boundary(shape):
-                self._add_boundary_component(shape)
-            elif self._is_component(shape):
-                self._add_simple_component(shape)
+        for shape in self._shapes:
+            self._budget.check()
+            self._load_page_element(shape)
+        self._keep_unmapped_containers()
+
+    def _load_page_element(self, shape):
+        if self._is_connector(shape):
+            self._add_connector(shape)
+        elif self._is_boundary(shape):
+            self._add_boundary_component(shape)
+        elif self._is_component(shape):
+            self._add_simple_component(shape)
 
     def _add_simple_component(self, component_shape):
-        self._visio_components.append(
-            self.component_factory.create_component(
-                component_shape, DiagramComponentOrigin.SIMPLE_COMPONENT, self._component_representer
+        if self.mapped_labels is None:
+            self._visio_components.append(
+                self.component_factory.create_component(
+                    component_shape, DiagramComponentOrigin.SIMPLE_COMPONENT, self._component_representer
+                )
             )
+            return
+
+        component = self.component_factory.create_component(
+            component_shape, DiagramComponentOrigin.SIMPLE_COMPONENT, None
         )
+        if self.mapped_labels.matches(component):
+            component.representation = self._component_representer.build_representation(component_shape)
+        else:
+            self._unmapped_components.append((component, component_shape))
+        self._visio_components.append(component)
+
+    def _keep_unmapped_containers(self):
+        """
+        Drops the components no mapping matches, unless they contain a mapped component or a boundary: the
+        pruning of the diagram moves the mapped children of a removed component to its parent, so those
+        take part in the parent inference as before. The bounds of a container hold the bounds of what it
+        contains, so the rest are found without building their geometry.
+        """
+        if not self._unmapped_components:
+            return
+
+        mapped_bounds = [component.representation.bounds for component in self._visio_components
+                         if component.representation is not None]
+        dropped = set()
+        for component, shape in self._unmapped_components:
+            (x_floor, y_floor), (x_top, y_top) = self._geometry.get_limits(shape.ID) \
+                if shape.ID in self._geometry else get_limits(shape)
+            if any(x_floor <= bounds[0] and y_floor <= bounds[1] and x_top >= bounds[2] and y_top >= bounds[3]
+                   for bounds in mapped_bounds):
+                component.representation = self._component_representer.build_representation(shape)
+            else:
+                dropped.add(id(component))
+
+        self._unmapped_components = []
+        self._visio_components = [component for component in self._visio_components
+                                  if id(component) not in dropped]
 
     def _add_boundary_component(self, component_shape):
         self._visio_components.append(
@@ -99,12 +180,23 @@ class VsdxParser:
         )
 
     def _add_connector(self, connector_shape):
-        visio_connector = self.connector_factory.create_connector(connector_shape)
+        visio_connector = self.connector_factory.create_connector(
+            connector_shape, self._connects.get_connects(connector_shape.ID)
+        )
         if visio_connector:
             self._visio_connectors.append(visio_connector)
 
     def _calculate_parents(self):
-        for component in self._visio_components:
-            component.parent = ParentCalculator(component).calculate_parent(
-                self._visio_components
-            )
+        if self.parent_workers is not None:
+            from mytml.tiled_parents import can_calculate_parents_in_tiles, calculate_parents_in_tiles
+
+            if can_calculate_parents_in_tiles(self._visio_components, self.parent_workers):
+                parents = calculate_parents_in_tiles(self._visio_components, self._diagram_limits,
+                                                     self.parent_workers, self._budget)
+                for component, parent in zip(self._visio_components, parents):
+                    component.parent = parent
+                return
+
+        parents = calculate_parents(self._visio_components, self._budget)
+        for component, parent in zip(self._visio_components, parents):
+            component.parent = parent
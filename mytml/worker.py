@@ -0,0 +1,106 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+# set once per worker process by init_worker
+_worker_mappings = None
+_worker_mapping_loader = None
+_worker_cache = None
+_worker_trace_memory = False
+_worker_limits = {}
+_worker_validate_otm = False
+_worker_topology_only = False
+_worker_parent_workers = None
+
+
+def read_file(path: str) -> str:
+    with open(path, 'r') as f:
+        return f.read()
+
+
+def read_mapping(path: str):
+    # compiled mappings are binary, mapping files are read as text
+    from mytml.compiled_mapping import is_compiled_mapping
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    return data if is_compiled_mapping(data) else read_file(path)
+
+
+def read_parsed_diagram(path: str):
+    # diagrams parsed before are mapped without parsing them again
+    from mytml.parsed_diagram import PARSED_DIAGRAM_EXTENSION, deserialize_diagram
+
+    if not path.lower().endswith(PARSED_DIAGRAM_EXTENSION):
+        return None
+    with open(path, 'rb') as f:
+        return deserialize_diagram(f.read())
+
+
+def init_worker(mapping_paths: [str], cache_dir: str = None, trace_memory: bool = False, limits: dict = None,
+                validate_otm: bool = False, topology_only: bool = False, override_paths: [str] = None,
+                parent_workers: int = None):
+    from mytml.processor import load_mappings
+    from mytml.cache import OTMCache
+
+    global _worker_mappings, _worker_mapping_loader, _worker_cache, _worker_trace_memory, _worker_limits, \
+        _worker_validate_otm, _worker_topology_only, _worker_parent_workers
+    with redirect_stdout(sys.stderr):
+        _worker_mappings = [read_mapping(path) for path in mapping_paths]
+        _worker_mapping_loader = load_mappings(_worker_mappings)
+        if override_paths:
+            overrides = [read_file(path) for path in override_paths]
+            _worker_mapping_loader = load_mappings(overrides, _worker_mapping_loader)
+            # the OTM cache keys on every mapping file
+            _worker_mappings = _worker_mappings + overrides
+    _worker_cache = OTMCache(cache_dir) if cache_dir else None
+    _worker_trace_memory = trace_memory
+    # keyword arguments of the ConversionBudget of every conversion
+    _worker_limits = limits or {}
+    _worker_validate_otm = validate_otm
+    _worker_topology_only = topology_only
+    _worker_parent_workers = parent_workers
+    if validate_otm:
+        from mytml.otm.otm_validator import get_otm_schema_validator
+
+        # compiled once for all the conversions of the worker
+        get_otm_schema_validator()
+    if trace_memory:
+        # loaded now, or the first conversion would also count the memory of the libraries it loads
+        import magic
+        import mytml.vsdx_parser
+
+
+def convert_diagram(path: str, project_id: str = None) -> tuple:
+    from mytml.processor import Processor
+    from mytml.otm.serialization import serialize_otm
+    from mytml.budget import ConversionBudget
+
+    start = time.perf_counter()
+    try:
+        # the conversion reports progress on stdout, which callers may reserve for their own output
+        with redirect_stdout(sys.stderr), open(path, 'r') as source:
+            processor = Processor(project_id or os.path.splitext(os.path.basename(path))[0], source,
+                                  _worker_mappings, cache=_worker_cache, mapping_loader=_worker_mapping_loader,
+                                  trace_memory=_worker_trace_memory, budget=ConversionBudget(**_worker_limits),
+                                  validate_otm=_worker_validate_otm, topology_only=_worker_topology_only,
+                                  diagram=read_parsed_diagram(path), parent_workers=_worker_parent_workers)
+            otm = processor.process()
+        return path, time.perf_counter() - start, serialize_otm(otm), None, processor.peak_memory
+    except Exception as e:
+        return path, time.perf_counter() - start, None, f'{e.__class__.__name__} {e}', None
+
+
+def convert_upload(data: bytes, project_id: str) -> tuple:
+    # the parser works on files, and unpacks them next to where they are
+    directory = tempfile.mkdtemp(prefix='mytml-')
+    try:
+        path = os.path.join(directory, 'diagram.vsdx')
+        with open(path, 'wb') as f:
+            f.write(data)
+        return convert_diagram(path, project_id)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
@@ -1,3 +1,5 @@
 from setuptools import setup, find_packages
 
-setup(name="mytml", version="1.2", packages=find_packages())
+setup(name="mytml", version="1.2", packages=find_packages(exclude=["benchmarks"]),
+      package_data={"mytml": ["data/*.json"]},
+      entry_points={"console_scripts": ["mytml=mytml.cli:main"]})
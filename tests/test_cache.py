@@ -0,0 +1,63 @@
+import contextlib
+import os
+import sys
+import yaml
+from mytml.cache import OTMCache
+from mytml.otm.serialization import serialize_otm
+from mytml.processor import Processor, load_mappings
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'mytml', 'data')
+SAMPLE_DIAGRAM = os.path.join(DATA, 'aws-with-tz-and-vpc.vsdx')
+SAMPLE_MAPPING = os.path.join(DATA, 'iriusrisk-visio-aws-mapping.yaml')
+
+
+def load_sample_mappings() -> tuple:
+    with open(SAMPLE_MAPPING) as f:
+        full = f.read()
+    mapping = yaml.safe_load(full)
+    mapping['components'] = [component for component in mapping['components']
+                             if component['label'] == 'Amazon EC2']
+    with contextlib.redirect_stdout(sys.stderr):
+        return load_mappings([full]), load_mappings([yaml.safe_dump(mapping)])
+
+
+def convert(mappings, mapping_loader, cache=None) -> str:
+    with contextlib.redirect_stdout(sys.stderr), open(SAMPLE_DIAGRAM) as source:
+        return serialize_otm(Processor('sample', source, mappings, cache=cache, mapping_loader=mapping_loader)
+                             .process())
+
+
+def test_mapping_loader_without_mapping_files_is_cached(tmp_path):
+    full_loader, _ = load_sample_mappings()
+    cache = OTMCache(str(tmp_path))
+
+    expected = convert(None, full_loader)
+    assert convert(None, full_loader, cache) == expected
+    assert convert(None, full_loader, cache) == expected
+    assert (cache.misses, cache.hits) == (1, 1)
+
+
+def test_mapping_loaders_with_different_mappings_do_not_share_entries(tmp_path):
+    full_loader, sparse_loader = load_sample_mappings()
+    cache = OTMCache(str(tmp_path))
+
+    full = convert([], full_loader, cache)
+    sparse = convert([], sparse_loader, cache)
+
+    assert sparse != full
+    assert sparse == convert([], sparse_loader)
+    assert (cache.misses, cache.hits) == (2, 0)
+
+
+def test_least_recently_used_entries_are_evicted_first(tmp_path):
+    cache = OTMCache(str(tmp_path), max_size=30)
+    for i, key in enumerate(['first', 'second', 'third']):
+        cache.put(key, '0123456789')
+        os.utime(tmp_path / f'{key}.otm.json', (i, i))
+    # read, so it is the most recently used
+    assert cache.get('first') == '0123456789'
+
+    cache.put('fourth', '0123456789')
+
+    assert cache.get('second') is None
+    assert [cache.get(key) for key in ('first', 'third', 'fourth')] == ['0123456789'] * 3
@@ -0,0 +1,29 @@
+import os
+import pytest
+from mytml.cli import main
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'mytml', 'data')
+SAMPLE_DIAGRAM = os.path.join(DATA, 'aws-with-tz-and-vpc.vsdx')
+
+
+@pytest.mark.parametrize('jobs', ['1', '2'])
+def test_convert_reports_a_missing_mapping(jobs, tmp_path, capsys):
+    missing = str(tmp_path / 'missing.yaml')
+
+    assert main(['convert', SAMPLE_DIAGRAM, '-m', missing, '-j', jobs]) == 1
+
+    captured = capsys.readouterr()
+    assert captured.out == ''
+    assert 'FileNotFoundError' in captured.err and missing in captured.err
+
+
+@pytest.mark.parametrize('jobs', ['1', '2'])
+def test_convert_reports_an_invalid_mapping(jobs, tmp_path, capsys):
+    invalid = tmp_path / 'invalid.yaml'
+    invalid.write_text('components:\n  - label: {$regex: "(a)\\\\1"}\n    type: backreference\n')
+
+    assert main(['convert', SAMPLE_DIAGRAM, '-m', str(invalid), '-j', jobs]) == 1
+
+    captured = capsys.readouterr()
+    assert captured.out == ''
+    assert 'Mapping files are not valid' in captured.err
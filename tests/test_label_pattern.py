@@ -0,0 +1,55 @@
+import pytest
+from mytml import label_pattern
+from mytml.label_pattern import LabelPatternMatcher, get_pattern_regex, validate_label_patterns
+
+
+def mapping_of(*labels) -> dict:
+    return {'components': [{'label': label, 'type': f'type-{i}'} for i, label in enumerate(labels)]}
+
+
+def test_global_flags_are_scoped_to_their_pattern():
+    labels = [{'$glob': 'Amazon *'}, {'$regex': '(?i)custom MACHINE'}, {'$regex': '(?x) log \\s system # comment'}]
+    validate_label_patterns(mapping_of(*labels))
+
+    matcher = LabelPatternMatcher([(get_pattern_regex(label), label) for label in labels])
+    assert matcher.match('Custom machine') == labels[1]
+    assert matcher.match('log system') == labels[2]
+    assert matcher.match('Amazon EC2') == labels[0]
+    # the flag of the second pattern does not reach the others
+    assert matcher.match('amazon EC2') is None
+
+
+@pytest.mark.parametrize('regex', ['(a)\\1', '(?P<a>a)b\\1', '(a)?(?(1)b|c)'])
+def test_numbered_group_references_are_rejected(regex):
+    with pytest.raises(Exception, match='refers to a group by number'):
+        validate_label_patterns(mapping_of({'$regex': regex}))
+
+
+def test_named_group_references_and_octal_escapes_are_valid():
+    labels = [{'$regex': '(?P<letter>a)(?P=letter)'}, {'$regex': '\\101[\\1]'}]
+    validate_label_patterns(mapping_of(*labels))
+
+    matcher = LabelPatternMatcher([(get_pattern_regex(label), label) for label in labels])
+    assert matcher.match('aa') == labels[0]
+    assert matcher.match('A\x01') == labels[1]
+
+
+def test_patterns_that_do_not_compile_together_are_rejected():
+    labels = [{'$regex': '(?P<name>a)'}, {'$regex': '(?P<name>b)'}]
+    with pytest.raises(Exception, match='cannot be combined'):
+        validate_label_patterns(mapping_of(*labels))
+
+
+def test_matches_kept_are_bounded(monkeypatch):
+    monkeypatch.setattr(label_pattern, 'LABEL_MATCH_CACHE_SIZE', 10)
+    base = LabelPatternMatcher([('Amazon .*', 'aws')])
+    matcher = LabelPatternMatcher([('server-[0-9]+', 'server')], base)
+
+    for i in range(100):
+        assert matcher.match(f'server-{i}') == 'server'
+        assert matcher.match(f'Amazon {i}') == 'aws'
+        assert matcher.match(f'other {i}') is None
+
+    assert matcher.match('server-99') == 'server'
+    assert matcher._LabelPatternMatcher__cached_match.cache_info().currsize == 10
+    assert base._LabelPatternMatcher__cached_match.cache_info().currsize == 10
@@ -0,0 +1,46 @@
+import contextlib
+import os
+import sys
+import pytest
+import yaml
+from mytml.compiled_mapping import compile_mappings
+from mytml.mapping import LayeredMappingLoader
+from mytml.otm.serialization import serialize_otm
+from mytml.processor import Processor, load_mappings
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'mytml', 'data')
+SAMPLE_DIAGRAMS = [os.path.join(DATA, 'aws-with-tz-and-vpc.vsdx'), os.path.join(DATA, 'visio-basic-example.vsdx')]
+SAMPLE_MAPPING = os.path.join(DATA, 'iriusrisk-visio-aws-mapping.yaml')
+
+OVERRIDE_MAPPING = yaml.safe_dump({
+    'trustzones': [{'label': 'Private Secured Cloud', 'type': 'overridden-private', 'default': True}],
+    'components': [
+        {'label': 'Amazon EC2', 'type': 'overridden-ec2'},
+        {'label': 'Custom log system', 'type': 'custom-log'},
+        {'label': {'$regex': '(?i)private .*'}, 'type': 'private'},
+    ],
+    'dataflows': [],
+})
+
+
+def read_base_mapping() -> str:
+    with open(SAMPLE_MAPPING) as f:
+        return f.read()
+
+
+def convert(diagram_path: str, mapping_loader) -> str:
+    with contextlib.redirect_stdout(sys.stderr), open(diagram_path) as source:
+        return serialize_otm(Processor('sample', source, [], mapping_loader=mapping_loader).process())
+
+
+@pytest.mark.parametrize('compiled_base', [False, True])
+@pytest.mark.parametrize('diagram_path', SAMPLE_DIAGRAMS)
+def test_override_stacked_on_a_base_maps_as_the_merged_files(diagram_path, compiled_base):
+    base = read_base_mapping()
+    with contextlib.redirect_stdout(sys.stderr):
+        merged_loader = load_mappings([base, OVERRIDE_MAPPING])
+        base_loader = load_mappings([compile_mappings([('base', base)])] if compiled_base else [base])
+        layered_loader = load_mappings([OVERRIDE_MAPPING], base_loader)
+
+    assert isinstance(layered_loader, LayeredMappingLoader)
+    assert convert(diagram_path, layered_loader) == convert(diagram_path, merged_loader)
@@ -0,0 +1,75 @@
+import xml.etree.ElementTree as ET
+from mytml import master_cache
+from mytml.master_cache import MasterCache, get_master_attributes
+
+
+class FakeMasterShape:
+    def __init__(self, text):
+        self.text = text
+        self.child_shapes = []
+        self.cells = {}
+
+    def cell_value(self, cell_name):
+        return None
+
+
+class FakeMasterPage:
+    def __init__(self, unique_id, text):
+        self.master_unique_id = unique_id
+        self.xml = ET.ElementTree(ET.fromstring(f'<MasterContents><Text>{text}</Text></MasterContents>'))
+
+
+class FakeShape:
+    def __init__(self, master_page: FakeMasterPage, text):
+        self.master_page = master_page
+        self.master_shape_ID = '5'
+        self.master_shape = FakeMasterShape(text)
+
+
+def test_hits_and_misses_are_counted():
+    cache = MasterCache()
+    built = []
+
+    def build(value):
+        built.append(value)
+        return value
+
+    assert cache.resolve('a', lambda: build(1)) == 1
+    assert cache.resolve('a', lambda: build(2)) == 1
+    assert cache.resolve('b', lambda: build(3)) == 3
+
+    assert built == [1, 3]
+    assert cache.stats() == {'size': 2, 'max_size': master_cache.MASTER_CACHE_MAX_SIZE, 'hits': 1, 'misses': 2}
+
+    cache.clear()
+    assert cache.stats()['size'] == cache.hits == cache.misses == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = MasterCache(max_size=2)
+    cache.resolve('a', lambda: 1)
+    cache.resolve('b', lambda: 2)
+    # 'a' becomes the most recently used, so 'b' is the one evicted
+    cache.resolve('a', lambda: None)
+    cache.resolve('c', lambda: 3)
+
+    assert len(cache) == 2
+    assert cache.resolve('a', lambda: None) == 1
+    assert cache.resolve('c', lambda: None) == 3
+    assert cache.resolve('b', lambda: 4) == 4
+    assert cache.stats()['misses'] == 4
+
+
+def test_master_changed_under_the_same_unique_id_is_not_served_from_the_cache(monkeypatch):
+    monkeypatch.setattr(master_cache, 'MASTER_CACHE', MasterCache())
+
+    first = get_master_attributes(FakeShape(FakeMasterPage('{UNIQUE-ID}', 'Web server'), 'Web server'))
+    same = get_master_attributes(FakeShape(FakeMasterPage('{UNIQUE-ID}', 'Web server'), 'Other text'))
+    changed = get_master_attributes(FakeShape(FakeMasterPage('{UNIQUE-ID}', 'Database'), 'Database'))
+
+    assert first.text == 'Web server'
+    # the same master XML is served from the cache, whatever the document it is read from
+    assert same is first
+    assert changed.text == 'Database'
+    assert master_cache.MASTER_CACHE.stats()['hits'] == 1
+    assert master_cache.MASTER_CACHE.stats()['misses'] == 2
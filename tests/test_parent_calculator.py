@@ -0,0 +1,46 @@
+import random
+import pytest
+from shapely.geometry import Polygon, box
+from mytml.budget import BudgetExceededError, ConversionBudget
+from mytml.diagram import DiagramComponent, DiagramComponentOrigin
+from mytml.parent_calculator import ParentCalculator, calculate_parents
+
+
+def create_components(count: int, seed: int) -> list:
+    generator = random.Random(seed)
+    components = []
+    for i in range(count):
+        x, y = generator.randrange(0, 40), generator.randrange(0, 40)
+        width, height = generator.choice([1, 2, 5, 10, 30]), generator.choice([1, 2, 5, 10, 30])
+        if generator.random() < 0.1:
+            representation = Polygon([(x, y), (x + width, y), (x + width / 2, y + height)])
+        else:
+            representation = box(x, y, x + width, y + height)
+        components.append(DiagramComponent(id=f'c{i}', name=f'c{i}', origin=DiagramComponentOrigin.SIMPLE_COMPONENT,
+                                           representation=representation))
+    # the same geometry twice, which contain each other and tie on area
+    for i in range(0, count, 25):
+        components.append(DiagramComponent(id=f'd{i}', origin=DiagramComponentOrigin.BOUNDARY,
+                                           representation=components[i].representation))
+    return components
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_parents_are_the_ones_of_testing_every_component(seed):
+    components = create_components(200, seed)
+
+    parents = calculate_parents(components)
+
+    assert parents == [ParentCalculator(component).calculate_parent(components) for component in components]
+    assert any(parent is not None for parent in parents)
+
+
+def test_containment_tests_are_counted_as_testing_every_component():
+    components = create_components(50, 1)
+    budget = ConversionBudget().start()
+
+    calculate_parents(components, budget)
+
+    assert budget.containment_tests == len(components) ** 2
+    with pytest.raises(BudgetExceededError):
+        calculate_parents(components, ConversionBudget(max_containment_tests=len(components)).start())
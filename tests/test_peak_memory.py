@@ -0,0 +1,29 @@
+import contextlib
+import os
+import sys
+from benchmarks.peak_memory import DEFAULT_COPIES, PEAK_MEMORY_BUDGET, SAMPLE_DIAGRAM, SAMPLE_MAPPING, \
+    build_synthetic_diagram
+from mytml.memory import PeakMemoryTracer
+from mytml.processor import Processor, load_mappings
+
+MEGABYTE = 1024 * 1024
+
+
+def convert(diagram_path: str, mapping_loader):
+    with contextlib.redirect_stdout(sys.stderr), open(diagram_path) as source:
+        return Processor('sample', source, [], mapping_loader=mapping_loader).process()
+
+
+def test_peak_memory_of_a_large_diagram_is_within_budget(tmp_path):
+    with open(SAMPLE_MAPPING) as f, contextlib.redirect_stdout(sys.stderr):
+        mapping_loader = load_mappings([f.read()])
+    diagram_path = os.path.join(tmp_path, f'synthetic-{DEFAULT_COPIES}.vsdx')
+    build_synthetic_diagram(DEFAULT_COPIES, diagram_path)
+    # the libraries a conversion loads on first use are not part of its memory
+    convert(SAMPLE_DIAGRAM, mapping_loader)
+
+    with PeakMemoryTracer() as tracer:
+        otm = convert(diagram_path, mapping_loader)
+
+    assert len(otm.components) > DEFAULT_COPIES
+    assert tracer.peak < PEAK_MEMORY_BUDGET * MEGABYTE
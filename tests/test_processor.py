@@ -0,0 +1,68 @@
+import contextlib
+import json
+import os
+import sys
+import pytest
+import yaml
+import mytml.processor
+from mytml.otm.serialization import serialize_otm
+from mytml.processor import Processor
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'mytml', 'data')
+SAMPLE_DIAGRAM = os.path.join(DATA, 'aws-with-tz-and-vpc.vsdx')
+SAMPLE_MAPPING = os.path.join(DATA, 'iriusrisk-visio-aws-mapping.yaml')
+
+
+def read_sparse_mapping() -> str:
+    # only some components are mapped, so the rest of them are pruned
+    with open(SAMPLE_MAPPING) as f:
+        mapping = yaml.safe_load(f)
+    mapping['components'] = [component for component in mapping['components']
+                             if component['label'] in ('Amazon EC2', 'Amazon CloudWatch')]
+    return yaml.safe_dump(mapping)
+
+
+def convert(mapping: str, **arguments):
+    with contextlib.redirect_stdout(sys.stderr), open(SAMPLE_DIAGRAM) as source:
+        return Processor('sample', source, [mapping], **arguments).process()
+
+
+def test_mappings_prepared_apart_map_and_prune_as_the_default(monkeypatch):
+    mapping = read_sparse_mapping()
+    expected = convert(mapping)
+
+    compiled_loaders = []
+    compiled_loader_class = mytml.processor.CompiledMappingLoader
+    monkeypatch.setattr(mytml.processor, 'available_cpus', lambda: 2)
+    monkeypatch.setattr(mytml.processor, 'CompiledMappingLoader',
+                        lambda compiled: compiled_loaders.append(compiled) or compiled_loader_class(compiled))
+    otm = convert(mapping, prepare_mappings_apart=True)
+
+    assert compiled_loaders, 'the mappings were not prepared in another process'
+    assert {component.type for component in otm.components} == {'ec2', 'cloudwatch'}
+    assert serialize_otm(otm) == serialize_otm(expected)
+
+
+def test_mappings_are_not_prepared_apart_by_default(monkeypatch):
+    monkeypatch.setattr(mytml.processor, 'available_cpus', lambda: 2)
+    monkeypatch.setattr(mytml.processor, 'CompiledMappingLoader', None)
+    assert convert(read_sparse_mapping()).components
+
+
+def test_cached_otm_is_validated_when_asked(tmp_path):
+    from mytml.cache import OTMCache
+    from mytml.otm.otm_validator import OTMValidationError
+
+    mapping = read_sparse_mapping()
+    cache = OTMCache(str(tmp_path))
+    convert(mapping, cache=cache)
+    # an entry cached by a conversion that did not validate its OTM, which turns out to be invalid
+    entry_path, = tmp_path.glob('*.otm.json')
+    document = json.loads(entry_path.read_text())
+    document['components'][0]['parent'] = {'trustZone': 'missing'}
+    entry_path.write_text(json.dumps(document))
+
+    assert convert(mapping, cache=cache).components[0].parent == 'missing'
+    with pytest.raises(OTMValidationError, match='missing'):
+        convert(mapping, cache=cache, validate_otm=True)
+    assert cache.hits == 2
@@ -0,0 +1,95 @@
+import contextlib
+import http.client
+import json
+import os
+import sys
+import pytest
+from mytml.service import ConversionService
+from mytml.validator import MAX_SIZE
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'mytml', 'data')
+SAMPLE_DIAGRAM = os.path.join(DATA, 'aws-with-tz-and-vpc.vsdx')
+SAMPLE_MAPPING = os.path.join(DATA, 'iriusrisk-visio-aws-mapping.yaml')
+
+
+@pytest.fixture(scope='module')
+def service():
+    with contextlib.redirect_stdout(sys.stderr):
+        service = ConversionService([SAMPLE_MAPPING], port=0, workers=1, max_queue=1).start()
+    yield service
+    service.stop()
+
+
+def request(service, method: str, path: str, body: bytes = None, headers: dict = None) -> tuple:
+    host, port = service.server_address[:2]
+    connection = http.client.HTTPConnection(host, port, timeout=60)
+    try:
+        connection.putrequest(method, path)
+        for name, value in (headers or {}).items():
+            connection.putheader(name, value)
+        if body is not None and 'Content-Length' not in (headers or {}):
+            connection.putheader('Content-Length', str(len(body)))
+        connection.endheaders(body)
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def read_sample_diagram() -> bytes:
+    with open(SAMPLE_DIAGRAM, 'rb') as f:
+        return f.read()
+
+
+def test_convert_answers_the_otm_of_a_diagram(service):
+    status, otm = request(service, 'POST', '/convert?project_id=sample', read_sample_diagram())
+
+    assert status == 200
+    assert otm['project']['id'] == 'sample'
+    assert otm['components']
+
+
+def test_convert_rejects_an_invalid_diagram(service):
+    status, body = request(service, 'POST', '/convert', b'not a diagram')
+
+    assert status == 400
+    assert body['error']
+
+
+@pytest.mark.parametrize('content_length, status', [(None, 411), ('abc', 400), ('-1', 400),
+                                                    (str(MAX_SIZE + 1), 413)])
+def test_convert_checks_the_content_length(service, content_length, status):
+    headers = {} if content_length is None else {'Content-Length': content_length}
+
+    assert request(service, 'POST', '/convert', headers=headers)[0] == status
+
+
+def test_convert_rejects_requests_over_a_full_queue(service):
+    metrics = service.metrics
+    # the worker and the queue are busy
+    metrics.in_flight += metrics.workers + service.max_queue
+    try:
+        status, body = request(service, 'POST', '/convert', read_sample_diagram())
+    finally:
+        metrics.in_flight -= metrics.workers + service.max_queue
+
+    assert status == 503
+    assert metrics.json()['rejected'] >= 1
+
+
+def test_convert_times_out_on_a_conversion_that_does_not_finish(service, monkeypatch):
+    monkeypatch.setattr(service, 'conversion_timeout', 0.001)
+
+    status, body = request(service, 'POST', '/convert', read_sample_diagram())
+
+    assert status == 504
+    assert 'did not finish' in body['error']
+
+
+def test_health_and_metrics(service):
+    assert request(service, 'GET', '/health') == (200, {"status": "ok"})
+
+    status, metrics = request(service, 'GET', '/metrics')
+    assert status == 200
+    assert metrics['workers'] == 1
+    assert metrics['requests'] >= metrics['completed'] + metrics['failed'] + metrics['rejected']